@@ -0,0 +1,84 @@
+"""Benchmark of send/receive and compare path against line rate of high baudrates.
+
+Frames are echoed by a local TCP server through TCPRawSocket, which shares serial_sendrcv receive path with serial ports,
+so the measured rate is the Python side ceiling. The port is set to each baudrate in turn, as the receive path waits
+for surplus echo bytes during a few character times. Headroom above 1x means the path keeps up with that baudrate.
+
+Run from project root :
+	python -m benchmarks.baudrate
+"""
+
+import argparse, socket, sys, threading, time
+
+from serial_bert import core, utils
+
+
+def echo_server() -> tuple[socket.socket, int]:
+	server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+	server.bind(('127.0.0.1', 0))
+	server.listen(1)
+
+	def serve():
+		conn, _ = server.accept()
+		conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+		with conn:
+			while (data := conn.recv(65536)):
+				conn.sendall(data)
+
+	threading.Thread(target=serve, daemon=True).start()
+	return server, server.getsockname()[1]
+
+def measure_exchange(port: utils.SerialPort, frame: bytes, budget: float) -> tuple[float, list[tuple]]:
+	"""Return (exchange bytes/s, exchanges) of frame over budget seconds."""
+	n = 0
+	exchanges = list()
+	t0 = time.perf_counter()
+	while (dt := time.perf_counter() - t0)<budget:
+		exchanges.append(utils.serial_sendrcv(port, frame, timeout=1))
+		n += 1
+	return n * len(frame) / dt, exchanges
+
+def measure_compare(exchanges: list[tuple], bits_struct: core.BitStruct) -> float:
+	"""Return compare bytes/s of exchanges."""
+	t0 = time.perf_counter()
+	results = core.analyse_exchanges(exchanges, bits_struct)
+	return sum(r.total_bytes for r in results) / (time.perf_counter() - t0)
+
+def main(argv: list[str] | None = None) -> None:
+	parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+	parser.add_argument('--baudrates', type=int, nargs='+', default=[115200, 921600, 2000000, 3000000, 4000000])
+	parser.add_argument('--sizes', type=int, nargs='+', default=[64, 255, 1024, 4096])
+	parser.add_argument('--budget', type=float, default=1.0, help='Seconds spent per measurement')
+	args = parser.parse_args(argv)
+
+	bits_struct = (1, 8, 0, 1)
+	server, tcp_port = echo_server()
+	port = utils.serial_port_factory(remote_ip='127.0.0.1', remote_port=tcp_port, baudrate=args.baudrates[0])
+	# size : (compare bytes/s, exchange bytes/s of each baudrate)
+	rows: dict[int, tuple[float, list[float]]] = dict()
+	try:
+		for size in args.sizes:
+			frame = core.strpattern(size)
+			rates = list()
+			for baud in args.baudrates:
+				# Receive path waits for surplus echo bytes during a few character times of the port baudrate
+				port.baudrate = baud
+				rate, exchanges = measure_exchange(port, frame, args.budget)
+				rates.append(rate)
+			rows[size] = (measure_compare(exchanges, bits_struct), rates)
+	finally:
+		port.close()
+		server.close()
+
+	header = ''.join(f' {rate:>9}' for rate in args.baudrates)
+	print(f'Exchange (kB/s) at port baudrate\n{"size":>6} {"compare (kB/s)":>15}{header}')
+	for size, (compare_rate, rates) in rows.items():
+		print(f'{size:>6} {compare_rate/1e3:>15.0f}' + ''.join(f' {rate/1e3:>9.0f}' for rate in rates))
+	print(f'\nHeadroom against line rate\n{"size":>6}{header}')
+	for size, (compare_rate, rates) in rows.items():
+		# Both stages run concurrently in a test, the slower one bounds the throughput
+		print(f'{size:>6}' + ''.join(f' {min(rate, compare_rate) / (baud / sum(bits_struct)):>8.1f}x' for rate, baud in zip(rates, args.baudrates)))
+	sys.stdout.flush()
+
+if __name__=='__main__':
+	main()
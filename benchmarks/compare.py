@@ -0,0 +1,45 @@
+"""Benchmark of unequal-length frame comparators : difflib based bytestr_compare vs bytes_resync_compare.
+
+Run from project root :
+	python -m benchmarks.compare
+"""
+
+import argparse, sys, time
+from typing import Callable
+
+from serial_bert import core
+from serial_bert.simulator import corrupt
+
+
+def timeit(func: Callable, *args, budget: float = 0.5) -> tuple[int, float]:
+	"""Call func repeatedly until budget seconds elapsed, return (calls, seconds per call)."""
+	n = 0
+	t0 = time.perf_counter()
+	while True:
+		func(*args)
+		n += 1
+		dt = time.perf_counter() - t0
+		if dt>=budget: return n, dt / n
+
+def main(argv: list[str] | None = None) -> None:
+	parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+	parser.add_argument('--sizes', type=int, nargs='+', default=[64, 128, 256, 512, 1024])
+	parser.add_argument('--difflib-max', type=int, default=256, help='Skip difflib path above this frame size, ndiff degrades badly on long periodic frames')
+	parser.add_argument('--budget', type=float, default=0.5, help='Seconds spent per measurement')
+	args = parser.parse_args(argv)
+
+	print(f'{"size":>6} {"difflib (us)":>14} {"resync (us)":>14} {"speedup":>9}')
+	for size in args.sizes:
+		tx = core.strpattern(size)
+		rx = corrupt(tx, n_sub=2, n_drop=3, n_ins=1, seed=size)
+		_, t_resync = timeit(core.bytes_resync_compare, tx, rx, budget=args.budget)
+		if size<=args.difflib_max:
+			_, t_difflib = timeit(core.bytestr_compare, tx, rx, budget=args.budget)
+			print(f'{size:>6} {t_difflib*1e6:>14.1f} {t_resync*1e6:>14.1f} {t_difflib/t_resync:>8.1f}x')
+		else:
+			print(f'{size:>6} {"skipped":>14} {t_resync*1e6:>14.1f} {"-":>9}')
+	sys.stdout.flush()
+
+
+if __name__=='__main__':
+	main()
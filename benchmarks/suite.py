@@ -0,0 +1,217 @@
+"""Benchmark suite of BER pipeline hot paths, no hardware needed.
+
+Each case reports calls per second and memory allocated by one call (tracemalloc). Results can be written as JSON and
+compared against a previous run, so regressions between releases show up as a ratio below 1.
+
+Run from project root :
+	python -m benchmarks.suite
+	python -m benchmarks.suite --filter compare --json bench.json
+	python -m benchmarks.suite --baseline bench.json
+"""
+
+import argparse, contextlib, json, os, platform, random, sys, threading, time, tracemalloc
+from typing import Any, Callable, ContextManager, Iterator
+
+from serial_bert import core, utils
+from serial_bert.simulator import SimulatedEchoServer, SimulatedPort, corrupt
+from serial_bert.version import __version__
+
+BITS_STRUCT: core.BitStruct = (1, 8, 0, 1)
+# Name of case : context manager yielding the callable to measure
+CASES: dict[str, Callable[[], ContextManager[Callable[[], Any]]]] = dict()
+
+
+class Skip(Exception):
+	pass
+
+
+def case(name: str):
+	def register(setup: Callable[[], Iterator[Callable[[], Any]]]):
+		CASES[name] = contextlib.contextmanager(setup)
+		return setup
+	return register
+
+for size in (64, 1024):
+	@case(f'strpattern[{size}]')
+	def _(size=size):
+		yield lambda: core.strpattern(size)
+
+	@case(f'randpattern[{size}]')
+	def _(size=size):
+		yield lambda: core.randpattern(size)
+
+for size in (255, 1024):
+	@case(f'bytes_compare[{size}]')
+	def _(size=size):
+		tx = core.strpattern(size)
+		rx = corrupt(tx, n_sub=2, seed=size)
+		yield lambda: core.bytes_compare(tx, rx)
+
+	@case(f'bytes_resync_compare[{size}]')
+	def _(size=size):
+		tx = core.strpattern(size)
+		rx = corrupt(tx, n_sub=2, n_drop=3, n_ins=1, seed=size)
+		yield lambda: core.bytes_resync_compare(tx, rx)
+
+@case('bytestr_compare[255]')
+def _():
+	# difflib based, degrades badly on longer periodic frames
+	tx = core.strpattern(255)
+	rx = corrupt(tx, n_sub=2, n_drop=3, n_ins=1)
+	yield lambda: core.bytestr_compare(tx, rx)
+
+@case('LoopBackData[255,equal]')
+def _():
+	tx = core.strpattern(255)
+	rx = corrupt(tx, n_sub=2)
+	yield lambda: core.LoopBackData(tx, rx, 0.01, BITS_STRUCT)
+
+@case('LoopBackData[255,resync]')
+def _():
+	tx = core.strpattern(255)
+	rx = corrupt(tx, n_sub=2, n_drop=3, n_ins=1)
+	yield lambda: core.LoopBackData(tx, rx, 0.01, BITS_STRUCT)
+
+for count in (10_000, 100_000, 1_000_000):
+	@case(f'LoopBackTest.aggregates[{count}]')
+	def _(count=count):
+		test = core.LoopBackTest(port=SimulatedPort())
+		rnd = random.Random(count)
+		pool = [core.LoopBackData(tx, corrupt(tx, n_sub=i % 3, seed=i), rnd.uniform(0.005, 0.02), test.bits_structure) for i, tx in enumerate(core.strpattern(255) for _ in range(64))]
+		for i in range(count):
+			test._push(pool[i % len(pool)])
+
+		def read():
+			return (test.counter, test.total_bits, test.total_error_bits, test.bit_error_rate, test.avg_propagation_time,
+				test.std_propagation_time, test.p99_propagation_time, test.avg_travel_time)
+		yield read
+
+@case('confidence_level[cached]')
+def _():
+	yield lambda: core.confidence_level(10**9, 1e-9, 3)
+
+@case('confidence_level[uncached]')
+def _():
+	compute = core._confidence_level.__wrapped__
+	args = [(10**9, 1e-9, 3), (10**11, 1e-6, 100_000), (10**13, 1e-6, 10_000_000)]
+	yield lambda: [compute(*arg) for arg in args]
+
+@case('exchange[tcp,255]')
+def _():
+	with SimulatedEchoServer() as server:
+		port = utils.serial_port_factory(remote_ip=server.address[0], remote_port=server.address[1])
+		frame = core.strpattern(255)
+		try:
+			yield lambda: core.LoopBackData(*utils.serial_sendrcv(port, frame, timeout=1)[:3], BITS_STRUCT)
+		finally:
+			port.close()
+
+@case('exchange[pty,255]')
+def _():
+	if os.name!='posix': raise Skip('pty requires POSIX')
+	import serial, tty
+	master, slave = os.openpty()
+	tty.setraw(master)
+	tty.setraw(slave)
+
+	def echo():
+		# Echo side reads into its own buffer, so traced allocations belong to the exchange only
+		buffer = memoryview(bytearray(65536))
+		try:
+			while (n := os.readv(master, [buffer])):
+				os.write(master, buffer[:n])
+		except OSError:
+			pass
+
+	threading.Thread(target=echo, daemon=True).start()
+	port = serial.Serial(os.ttyname(slave), 921600, timeout=1)
+	frame = core.strpattern(255)
+	try:
+		yield lambda: core.LoopBackData(*utils.serial_sendrcv(port, frame, timeout=1)[:3], BITS_STRUCT)
+	finally:
+		port.close()
+		os.close(slave)
+		os.close(master)
+
+
+def measure(func: Callable[[], Any], budget: float) -> dict[str, Any]:
+	"""Call func until budget seconds elapsed, then trace the allocations of one more call."""
+	func()
+	n = 0
+	t0 = time.perf_counter()
+	while (dt := time.perf_counter() - t0)<budget:
+		func()
+		n += 1
+	tracemalloc.start()
+	try:
+		base, _ = tracemalloc.get_traced_memory()
+		tracemalloc.reset_peak()
+		output = func()
+		current, peak = tracemalloc.get_traced_memory()
+	finally:
+		tracemalloc.stop()
+	del output
+	return {'ops_per_sec': n / dt, 'mean_us': dt / n * 1e6, 'calls': n, 'alloc_bytes': peak - base, 'retained_bytes': current - base}
+
+def run(names: list[str], budget: float) -> Iterator[dict[str, Any]]:
+	for name in names:
+		try:
+			with CASES[name]() as func:
+				yield {'name': name, **measure(func, budget)}
+		except Skip as err:
+			yield {'name': name, 'skipped': str(err)}
+
+def main(argv: list[str] | None = None) -> int:
+	parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+	parser.add_argument('--filter', nargs='+', default=[], help='Only run cases containing any of these substrings')
+	parser.add_argument('--budget', type=float, default=0.5, help='Seconds spent per case (default: %(default)s)')
+	parser.add_argument('--json', help='Write results to this JSON file')
+	parser.add_argument('--baseline', help='JSON results of a previous run to compare against')
+	parser.add_argument('--threshold', type=float, default=0.2, help='Relative slowdown reported as regression (default: %(default)s)')
+	parser.add_argument('--list', action='store_true', help='List case names and exit')
+	args = parser.parse_args(argv)
+
+	names = [name for name in CASES if not args.filter or any(f in name for f in args.filter)]
+	if args.list:
+		print('\n'.join(names))
+		return 0
+	baseline = dict()
+	if args.baseline:
+		with open(args.baseline, 'r') as file:
+			baseline = {r['name']: r for r in json.load(file)['results'] if 'ops_per_sec' in r}
+
+	regressions = 0
+	print(f'{"case":<34} {"ops/s":>12} {"mean (us)":>12} {"alloc (B)":>11} {"retained (B)":>13}' + (f' {"vs base":>8}' if baseline else ''))
+	results = list()
+	for result in run(names, args.budget):
+		results.append(result)
+		if 'skipped' in result:
+			print(f'{result["name"]:<34} skipped ({result["skipped"]})')
+			continue
+		line = f'{result["name"]:<34} {result["ops_per_sec"]:>12.0f} {result["mean_us"]:>12.2f} {result["alloc_bytes"]:>11} {result["retained_bytes"]:>13}'
+		if result['name'] in baseline:
+			ratio = result['ops_per_sec'] / baseline[result['name']]['ops_per_sec']
+			regressed = ratio<1 - args.threshold
+			regressions += regressed
+			line += f' {ratio:>7.2f}x' + (' REGRESSION' if regressed else '')
+		print(line)
+		sys.stdout.flush()
+
+	if args.json:
+		report = {
+			'version': __version__,
+			'python': platform.python_version(),
+			'platform': platform.platform(),
+			'machine': platform.machine(),
+			'cpu_count': os.cpu_count(),
+			'time': round(time.time(), 3),
+			'budget': args.budget,
+			'results': results,
+		}
+		with open(args.json, 'w') as file:
+			json.dump(report, file, indent=2)
+	return 1 if regressions else 0
+
+
+if __name__=='__main__':
+	sys.exit(main())
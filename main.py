@@ -18,10 +18,15 @@ def load_settings() -> None:
 				os.environ[stt] = str(getattr(settings, stt))
 
 
+@ui.page('/')
+def index() -> None:
+	# Every client gets its own GUI, ports are shared through the port scheduler
+	GUI()
+
+
 if __name__ in {"__main__", "__mp_main__"}:
 	load_settings()
 	binding.MAX_PROPAGATION_TIME = settings.MAX_PROPAGATION_TIME
-	app = GUI()
 	print(f'Application run on {settings.ALLOWED_HOST}:{settings.BIND_PORT}')
 	ui.run(
 		host=settings.ALLOWED_HOST,
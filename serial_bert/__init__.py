@@ -1,2 +1,9 @@
-from .gui import GUI
-from .version import __version__
\ No newline at end of file
+from .version import __version__
+
+
+def __getattr__(name: str):
+	# GUI pulls in nicegui, only import it when requested so headless use stays light
+	if name=='GUI':
+		from .gui import GUI
+		return GUI
+	raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
\ No newline at end of file
@@ -0,0 +1,285 @@
+"""Append-only capture file of raw (tx, rx, time_delta, phases) exchanges.
+
+Layout :
+	file header		= magic (8s), version (H), start/data/parity bits (3B), stop bits x2 (B), 2 pad bytes
+	record			= tx length (I), rx length (I), time delta (d), write/first byte/last byte ns (3q), tx payload, rx payload
+
+Version 1 records have no phase timestamps, they are still readable with phases as None.
+
+Records are written in bulk through an in-memory buffer and read back through mmap, payloads are zero-copy memoryview slices.
+A record truncated by an interrupted write at the end of file is ignored by the reader.
+"""
+
+import mmap, os, struct
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Iterable, Iterator, Self, TypeAlias
+
+import numpy as np
+
+from . import core, utils
+
+MAGIC: bytes = b'SBERCAP\x00'
+VERSION: int = 2
+FILE_HEADER = struct.Struct('<8sHBBBB2x')
+RECORD_HEADERS: dict[int, struct.Struct] = {1: struct.Struct('<IId'), 2: struct.Struct('<IIdqqq')}
+RECORD_HEADER = RECORD_HEADERS[VERSION]
+NO_PHASES: utils.Phases = (-1, -1, -1)
+Record: TypeAlias = tuple[memoryview, memoryview, float, utils.Phases | None]
+# Error bits per exchange histogram, last bin collects everything above
+ERROR_HISTOGRAM_BINS: int = 64
+
+
+def pack_header(bits_struct: core.BitStruct, version: int = VERSION) -> bytes:
+	start, data, parity, stop = bits_struct
+	return FILE_HEADER.pack(MAGIC, version, start, data, parity, int(stop * 2))
+
+def unpack_header(data: bytes) -> tuple[core.BitStruct, int]:
+	"""Bits structure and format version of capture header."""
+	if len(data)<FILE_HEADER.size: raise ValueError('Not a capture file, header is truncated.')
+	magic, version, start, data_bits, parity, stop2 = FILE_HEADER.unpack_from(data)
+	if magic!=MAGIC: raise ValueError('Not a capture file, invalid magic.')
+	if version not in RECORD_HEADERS: raise ValueError(f'Unsupported capture version {version}.')
+	return (start, data_bits, parity, stop2 / 2 if stop2 % 2 else stop2 // 2), version
+
+
+class CaptureWriter:
+	"""Buffered append-only writer, an existing capture is appended when its bits structure matches.
+
+	Records keep the format version of the file they are appended to, phases are dropped on a version 1 capture.
+	"""
+
+	def __init__(self, path: str | os.PathLike, bits_struct: core.BitStruct, buffer_size: int = 1 << 20) -> None:
+		self.path = path
+		self.bits_structure = bits_struct
+		self.buffer_size = buffer_size
+		self.records: int = 0
+		self._buffer = bytearray()
+		self.version = VERSION
+		exists = os.path.exists(path) and os.path.getsize(path)>0
+		if exists:
+			with CaptureReader(path) as reader:
+				if reader.bits_structure!=tuple(bits_struct): raise ValueError('Capture bits structure differs.')
+				end = reader.end
+				self.version = reader.version
+			# Drop a record truncated by an interrupted write, so appended records stay aligned
+			if end<os.path.getsize(path): os.truncate(path, end)
+		self._file = open(path, 'ab')
+		if not exists: self._file.write(pack_header(bits_struct))
+
+	def __enter__(self) -> Self:
+		return self
+
+	def __exit__(self, *_) -> None:
+		self.close()
+
+	def write(self, sent: bytes, received: bytes, time_delta: float, phases: utils.Phases | None = None) -> None:
+		if self.version==1:
+			self._buffer += RECORD_HEADERS[1].pack(len(sent), len(received), time_delta)
+		else:
+			self._buffer += RECORD_HEADER.pack(len(sent), len(received), time_delta, *(phases or NO_PHASES))
+		self._buffer += sent
+		self._buffer += received
+		self.records += 1
+		if len(self._buffer)>=self.buffer_size: self.flush()
+
+	def write_many(self, exchanges: Iterable[tuple]) -> None:
+		for exchange in exchanges:
+			self.write(*exchange)
+
+	def flush(self) -> None:
+		if self._buffer:
+			self._file.write(self._buffer)
+			self._buffer.clear()
+		self._file.flush()
+
+	def close(self) -> None:
+		if self._file.closed: return
+		self.flush()
+		self._file.close()
+
+
+class CaptureReader:
+	"""Memory mapped reader, items are (tx, rx, time_delta, phases) with tx/rx as memoryview into the mapping.
+
+	Views must be released (or copied) before close(), as exported buffers keep the mapping alive.
+	"""
+
+	def __init__(self, path: str | os.PathLike) -> None:
+		self.path = path
+		self._file = open(path, 'rb')
+		size = os.fstat(self._file.fileno()).st_size
+		self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+		self._view = memoryview(self._mmap) if self._mmap else memoryview(b'')
+		try:
+			# Header is copied, a view kept alive by the traceback would block close()
+			self.bits_structure, self.version = unpack_header(bytes(self._view[:FILE_HEADER.size]))
+		except ValueError:
+			self.close()
+			raise
+		self._header = RECORD_HEADERS[self.version]
+		self._offsets: np.ndarray | None = None
+
+	def __enter__(self) -> Self:
+		return self
+
+	def __exit__(self, *_) -> None:
+		self.close()
+
+	def __len__(self) -> int:
+		return len(self.offsets)
+
+	def __iter__(self) -> Iterator[Record]:
+		return self.records()
+
+	def __getitem__(self, index: int) -> Record:
+		return self._record(int(self.offsets[index]))
+
+	def _record(self, offset: int) -> Record:
+		n_tx, n_rx, time_delta, *phases = self._header.unpack_from(self._view, offset)
+		start = offset + self._header.size
+		phases = tuple(phases) if phases and phases[0]>=0 else None
+		return self._view[start:start+n_tx], self._view[start+n_tx:start+n_tx+n_rx], time_delta, phases
+
+	def _scan(self, offset: int = FILE_HEADER.size, stop: int | None = None) -> Iterator[int]:
+		size = len(self._view) if stop is None else min(stop, len(self._view))
+		header = self._header
+		while offset + header.size<=size:
+			n_tx, n_rx = header.unpack_from(self._view, offset)[:2]
+			end = offset + header.size + n_tx + n_rx
+			if end>size: break
+			yield offset
+			offset = end
+
+	@property
+	def offsets(self) -> np.ndarray:
+		"""Byte offset of every complete record, built once on first random access."""
+		if self._offsets is None:
+			self._offsets = np.fromiter(self._scan(), dtype=np.int64)
+		return self._offsets
+
+	@property
+	def end(self) -> int:
+		"""Byte offset just after the last complete record."""
+		if len(self.offsets)==0: return FILE_HEADER.size
+		n_tx, n_rx = self._header.unpack_from(self._view, int(self.offsets[-1]))[:2]
+		return int(self.offsets[-1]) + self._header.size + n_tx + n_rx
+
+	def records(self, start: int = 0, stop: int | None = None) -> Iterator[Record]:
+		if start==0 and stop is None and self._offsets is None:
+			# Sequential pass does not need the offset index
+			return (self._record(offset) for offset in self._scan())
+		return (self._record(int(offset)) for offset in self.offsets[start:stop])
+
+	def records_between(self, offset: int, stop: int) -> Iterator[Record]:
+		"""Records within byte range [offset, stop), offset must be a record boundary."""
+		return (self._record(pos) for pos in self._scan(offset, stop))
+
+	def close(self) -> None:
+		self._view.release()
+		if self._mmap is not None: self._mmap.close()
+		self._file.close()
+
+
+def analyse(path: str | os.PathLike, **kwargs) -> tuple[core.ResultStore, core.LoopBackStats]:
+	"""Re-run analysis on a capture without the link, kwargs are passed to ResultStore."""
+	with CaptureReader(path) as reader:
+		results = core.ResultStore(reader.bits_structure, **kwargs)
+		stats = core.LoopBackStats()
+		for sent, received, time_delta, phases in reader:
+			result = core.LoopBackData(sent, received, time_delta, reader.bits_structure, phases)
+			results.append(result)
+			stats.push(result)
+		# Drop last views into the mapping before it is closed
+		sent = received = result = None
+	return results, stats
+
+
+class CaptureAnalysis:
+	"""Mergeable aggregates of a capture partition : stats, error bits histogram and latest error exchanges."""
+	__slots__ = ('bits_structure', 'stats', 'histogram', 'errors', 'max_errors')
+
+	def __init__(self, bits_struct: core.BitStruct, max_errors: int = 1000) -> None:
+		self.bits_structure = bits_struct
+		self.stats = core.LoopBackStats()
+		self.histogram = np.zeros(ERROR_HISTOGRAM_BINS, dtype=np.int64)
+		# (record index, sent, received, time_delta), ordered by record index
+		self.errors: list[tuple[int, bytes, bytes, float]] = list()
+		self.max_errors = max_errors
+
+	def push(self, index: int, result: core.LoopBackData) -> None:
+		self.stats.push(result)
+		self.histogram[min(result.total_error_bits, ERROR_HISTOGRAM_BINS - 1)] += 1
+		if result.total_error_frames>0 and self.max_errors>0:
+			self.errors.append((index, bytes(result._sent), bytes(result._received), result.time_delta))
+			if len(self.errors)>2 * self.max_errors: del self.errors[:-self.max_errors]
+
+	def merge(self, other: 'CaptureAnalysis') -> 'CaptureAnalysis':
+		self.stats.merge(other.stats)
+		self.histogram += other.histogram
+		self.errors = sorted(self.errors + other.errors, key=lambda e: e[0])[-self.max_errors:] if self.max_errors>0 else []
+		return self
+
+	def to_dict(self) -> dict[str, Any]:
+		stats = self.stats
+		return {
+			'counter': stats.counter,
+			'total_frames_transmitted': stats.frames_transmitted,
+			'total_frames_received': stats.frames_received,
+			'total_error_frames': stats.error_frames,
+			'total_error_bits': stats.error_bits,
+			'total_bits': stats.bits,
+			'bit_error_rate': self.bit_error_rate,
+			'avg_propagation_time': stats.propagation_time.average,
+			'std_propagation_time': stats.propagation_time.stdev,
+			'avg_write_time': stats.write_time.average,
+			'avg_first_byte_time': stats.first_byte_time.average,
+			'p50_propagation_time': stats.latency.percentile(50),
+			'p99_propagation_time': stats.latency.percentile(99),
+			'p999_propagation_time': stats.latency.percentile(99.9),
+			'error_histogram': self.histogram.tolist(),
+		}
+
+	@property
+	def bit_error_rate(self):
+		if self.stats.error_bits>0:
+			return self.stats.error_bits / self.stats.bits
+		else:
+			return 1 / (self.stats.bits + 1) if self.stats.bits>0 else 0
+
+
+def analyse_shard(path: str | os.PathLike, first: int, offset: int, stop: int, max_errors: int = 1000) -> CaptureAnalysis:
+	"""Analyse records within byte range [offset, stop) of capture, first is the index of the first record."""
+	with CaptureReader(path) as reader:
+		partial = CaptureAnalysis(reader.bits_structure, max_errors)
+		for index, (sent, received, time_delta, phases) in enumerate(reader.records_between(offset, stop), first):
+			partial.push(index, core.LoopBackData(sent, received, time_delta, reader.bits_structure, phases))
+		# Drop last views into the mapping before it is closed
+		sent = received = None
+	partial.errors = partial.errors[-max_errors:] if max_errors>0 else []
+	return partial
+
+def analyse_parallel(path: str | os.PathLike, workers: int | None = None, shards: int | None = None, max_errors: int = 1000) -> CaptureAnalysis:
+	"""Split capture into shards of contiguous records, analyse them on a process pool and merge partial aggregates.
+
+	Workers map the capture themselves, so only shard boundaries and partial results cross process boundary.
+	"""
+	workers = workers or os.cpu_count()
+	with CaptureReader(path) as reader:
+		bits_struct = reader.bits_structure
+		offsets = reader.offsets
+		end = reader.end
+	n = len(offsets)
+	shards = max(1, min(shards or workers * 4, n))
+	bounds = [n * i // shards for i in range(shards + 1)]
+	jobs = [(bounds[i], int(offsets[bounds[i]]), int(offsets[bounds[i+1]]) if bounds[i+1]<n else end) for i in range(shards) if bounds[i]<bounds[i+1]]
+
+	result = CaptureAnalysis(bits_struct, max_errors)
+	if workers<=1 or len(jobs)<=1:
+		for first, offset, stop in jobs:
+			result.merge(analyse_shard(path, first, offset, stop, max_errors))
+		return result
+	with ProcessPoolExecutor(min(workers, len(jobs))) as pool:
+		futures = [pool.submit(analyse_shard, path, first, offset, stop, max_errors) for first, offset, stop in jobs]
+		for future in futures:
+			result.merge(future.result())
+	return result
@@ -0,0 +1,149 @@
+"""Headless BER test, results are printed as JSON lines.
+
+Examples :
+	python -m serial_bert --port /dev/ttyUSB0 --baudrate 115200 --duration 60
+	python -m serial_bert --remote 192.168.1.10:4001 --window 8 --pattern prbs15
+	python -m serial_bert --ports "COM3-6, 192.168.1.10:4001-4016" --config rack.json
+"""
+
+import argparse, asyncio, json, sys, time
+from typing import Any, TextIO
+
+from . import core, utils
+from .executor import executors
+from .version import __version__
+
+SUMMARY_FIELDS: tuple[str, ...] = (
+	'counter',
+	'total_frames_transmitted',
+	'total_frames_received',
+	'total_frames_lost',
+	'total_error_frames',
+	'total_error_bits',
+	'total_bits',
+	'bit_error_rate',
+	'avg_propagation_time',
+	'avg_travel_time',
+	'avg_first_byte_time',
+	'min_propagation_time',
+	'max_propagation_time',
+	'std_propagation_time',
+	'p50_propagation_time',
+	'p99_propagation_time',
+	'p999_propagation_time',
+)
+
+
+def build_parser() -> argparse.ArgumentParser:
+	parser = argparse.ArgumentParser(prog='python -m serial_bert', description=__doc__.splitlines()[0], epilog='\n'.join(__doc__.splitlines()[2:]), formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument('--version', action='version', version=__version__)
+	parser.add_argument('-c', '--config', help='JSON file of option values (same names as long flags, "-" replaced by "_"), flags take precedence')
+	target = parser.add_argument_group('port')
+	target.add_argument('--port', help='Serial device, e.g. COM3 or /dev/ttyUSB0')
+	target.add_argument('--remote', help='Raw socket target as host:port')
+	target.add_argument('--ports', help='Multiple ports tested concurrently, e.g. "COM3-6, 10.0.0.5:4001-4016"')
+	target.add_argument('--transport', choices=['thread', 'asyncio'], default='thread', help='Raw socket transport (default: %(default)s)')
+	target.add_argument('--baudrate', type=int, default=9600)
+	target.add_argument('--bytesize', type=int, choices=utils.DATA_BITS, default=8)
+	target.add_argument('--parity', choices=list(utils.PARITIES), default='N')
+	target.add_argument('--stopbits', type=float, choices=utils.STOP_BITS, default=1)
+	target.add_argument('--read-timeout', type=float, default=1, help='Port read timeout in seconds (default: %(default)s)')
+	test = parser.add_argument_group('test')
+	test.add_argument('--mode', choices=['frame', 'stream', 'once'], default='frame')
+	test.add_argument('--duration', type=float, default=10, help='Test duration in seconds (default: %(default)s)')
+	test.add_argument('--timeout', type=float, default=3, help='Data timeout in seconds (default: %(default)s)')
+	test.add_argument('--frame-length', type=int, default=255, help='Fixed frame length (default: %(default)s)')
+	test.add_argument('--diverse', action='store_true', help='Random frame length between --min-length and --frame-length')
+	test.add_argument('--min-length', type=int, default=1)
+	test.add_argument('--window', type=int, default=1, help='Frames in flight, 1 means stop-and-wait (default: %(default)s)')
+	test.add_argument('--pattern', choices=list(core.PATTERNS), default='string')
+	test.add_argument('--desired-ber', type=float, default=1e-6, help='Specified BER for confidence level (default: %(default)s)')
+	test.add_argument('--target-cl', type=float, help='Stop early once this confidence level (0-1) is reached or became unreachable, --duration is then the maximum')
+	output = parser.add_argument_group('output')
+	output.add_argument('-o', '--output', default='-', help='JSON lines output file, "-" for stdout (default: %(default)s)')
+	output.add_argument('--analyse', metavar='CAPTURE', help='Re-analyse a capture file on all CPU cores instead of testing a port')
+	output.add_argument('--workers', type=int, help='Worker processes for --analyse (default: CPU count)')
+	output.add_argument('--capture', help='Append raw exchanges of frame mode to this capture file, for offline re-analysis')
+	output.add_argument('--interval', type=float, default=0, help='Emit progress line every interval seconds, 0 disables (default: %(default)s)')
+	return parser
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+	parser = build_parser()
+	args, _ = parser.parse_known_args(argv)
+	if args.config:
+		with open(args.config, 'r') as file:
+			config = json.load(file)
+		unknown = set(config) - {action.dest for action in parser._actions}
+		if unknown: parser.error(f'unknown config option(s) {", ".join(sorted(unknown))}')
+		parser.set_defaults(**config)
+	args = parser.parse_args(argv)
+	if not args.analyse and sum(map(bool, (args.port, args.remote, args.ports)))!=1: parser.error('exactly one of --port, --remote or --ports is required')
+	return args
+
+def test_summary(test: Any, desired_ber: float) -> dict[str, Any]:
+	output = {attr: getattr(test, attr) for attr in SUMMARY_FIELDS}
+	output['confidence_level'] = core.confidence_level(test.total_bits, desired_ber, test.total_error_bits)
+	return output
+
+def emit(stream: TextIO, event: str, **fields) -> None:
+	# Numpy scalars are converted into their python value
+	stream.write(json.dumps({'event': event, 'time': round(time.time(), 3), **fields}, default=lambda o: o.item() if hasattr(o, 'item') else str(o)) + '\n')
+	stream.flush()
+
+async def run(args: argparse.Namespace, stream: TextIO) -> int:
+	port_kwargs = dict(baudrate=args.baudrate, bytesize=args.bytesize, parity=args.parity, stopbits=args.stopbits, timeout=args.read_timeout)
+	if args.transport=='asyncio': port_kwargs['transport'] = 'asyncio'
+	test_kwargs = dict(timeout=args.timeout)
+	if args.mode=='stream':
+		test_kwargs.update(duration=args.duration, pattern=args.pattern, target_cl=args.target_cl, desired_ber=args.desired_ber)
+	else:
+		test_kwargs.update(frame_length=None if args.diverse else args.frame_length, pattern=args.pattern, min_length=args.min_length, max_length=args.frame_length)
+		if args.mode=='frame': test_kwargs.update(duration=args.duration, window=args.window, target_cl=args.target_cl, desired_ber=args.desired_ber, capture=args.capture, analysis_executor=executors.analysis)
+	method = {'frame': 'run_for', 'stream': 'run_stream', 'once': 'run_once'}[args.mode]
+
+	if args.ports:
+		if args.capture: raise ValueError('Capture file is only supported on a single port.')
+		from .multiport import MultiPortTest
+		test = MultiPortTest(args.ports, **port_kwargs)
+		label = args.ports
+	else:
+		host, _, tcp_port = (args.remote or '').rpartition(':')
+		port = utils.serial_port_factory(port=args.port, **({'remote_ip': host, 'remote_port': int(tcp_port)} if args.remote else {}), **port_kwargs)
+		test = core.LoopBackTest(port=port)
+		label = args.port or args.remote
+		if not isinstance(port, utils.AsyncTCPRawSocket): test_kwargs['executor'] = executors.io(port.name)
+
+	emit(stream, 'start', port=label, mode=args.mode, pattern=args.pattern, version=__version__)
+	task = asyncio.ensure_future(getattr(test, method)(**test_kwargs))
+	try:
+		while not task.done():
+			await asyncio.wait([task], timeout=args.interval or None)
+			if not task.done(): emit(stream, 'progress', progress=round(test.progress, 4), **test_summary(test, args.desired_ber))
+		task.result()
+	finally:
+		if not args.ports: test.port.close()
+
+	if args.ports:
+		for row in test.rows[:-1]:
+			emit(stream, 'port', **row)
+	emit(stream, 'result', port=label, stop_reason=getattr(test, 'stop_reason', None), **test_summary(test, args.desired_ber))
+	return 0
+
+def main(argv: list[str] | None = None) -> int:
+	args = parse_args(argv)
+	stream = sys.stdout if args.output=='-' else open(args.output, 'a')
+	try:
+		if args.analyse:
+			from .capture import analyse_parallel
+			analysis = analyse_parallel(args.analyse, workers=args.workers)
+			emit(stream, 'result', capture=args.analyse, confidence_level=core.confidence_level(analysis.stats.bits, args.desired_ber, analysis.stats.error_bits), **analysis.to_dict())
+			return 0
+		return asyncio.run(run(args, stream))
+	except KeyboardInterrupt:
+		return 130
+	except Exception as err:
+		emit(stream, 'error', error=str(err) or type(err).__name__)
+		return 1
+	finally:
+		executors.shutdown(wait=False)
+		if stream is not sys.stdout: stream.close()
@@ -1,13 +1,35 @@
-import difflib, os, random, string, time
-from typing import Any, TypeAlias
+import asyncio, collections, difflib, functools, math, os, random, string, threading, time
+from typing import Any, Callable, Iterator, TypeAlias
 
-from scipy.stats import poisson
+import numpy as np
 from . import utils
 
 BitStruct: TypeAlias = tuple[int, int, int, int]
 BytesDiff: TypeAlias = dict[int, tuple[int, int]]
 
+# Marks the missing side of a dropped / inserted byte in BytesDiff, so 0x00 stays a valid data byte
+MISSING_BYTE: int = -1
+
 STRING_COLLECTION = string.ascii_letters + string.digits + '_'
+POPCOUNT_TABLE = np.array([i.bit_count() for i in range(256)], dtype=np.uint8)
+# ITU-T O.150 generator polynomials x^n + x^m + 1, as {n: m}
+PRBS_POLYNOMIALS: dict[int, int] = {7: 6, 9: 5, 15: 14, 23: 18, 31: 28}
+PRBS_MAX_TABLE_ORDER: int = 23
+PATTERNS: dict[str, str] = {'string': 'String', 'random': 'Random String', 'counter': 'Counter (00-FF)', 'binary': 'Random Binary', **{f'prbs{n}': f'PRBS-{n}' for n in PRBS_POLYNOMIALS}}
+COUNTER_COLLECTION = bytes(range(256))
+# Poisson sums are exact below this lambda, wider windows use a normal approximation
+POISSON_EXACT_MAX_LAMBDA: float = 1e6
+POISSON_WINDOW_SIGMA: float = 40
+# Upper bound of rows pre-allocated in result store from a test plan
+RESULT_RESERVE_MAX: int = 1 << 20
+# Exchanges buffered between I/O and analysis stage
+ANALYSIS_QUEUE_SIZE: int = 1024
+# Stream writer runs ahead of line time by at most a burst, and of the echo by at most max_ahead bytes (in line time)
+STREAM_BURST_TIME: float = 0.01
+STREAM_MAX_AHEAD_TIME: float = 0.25
+STREAM_POLL_INTERVAL: float = 0.001
+# Echo in flight is awaited this long after its line time, once writer stopped
+STREAM_DRAIN_MARGIN: float = 0.1
 
 def confidence_level(N: int, BER_s: float, E: float) -> float:
 	"""Determine the confidence level for a BER measurement by entering the specified BER, the data rate, the measurement time, and the number of detected errors. For reference, the number of transmitted bits (N) is shown as the data rate (BPS) multiplied by the measurement time (T).
@@ -20,7 +42,71 @@ def confidence_level(N: int, BER_s: float, E: float) -> float:
 	Result :
 		BER confidence level
 	"""
-	return 1 - poisson.cdf(E, N*BER_s)
+	return _confidence_level(int(N), float(BER_s), int(E))
+
+@functools.lru_cache(maxsize=4096)
+def _confidence_level(N: int, BER_s: float, E: int) -> float:
+	# CL = 1 - P(X<=E), X ~ Poisson(N*BER_s), expm1 keeps precision when CL is tiny
+	return abs(math.expm1(poisson_log_cdf(E, N * BER_s)))
+
+def poisson_log_cdf(k: int, lam: float) -> float:
+	"""Natural log of Poisson P(X<=k), summed in log space around the largest term so it stays finite up to lam ~ 1e12."""
+	if k<0: return -math.inf
+	if lam<=0: return 0.0
+	sigma = math.sqrt(lam)
+	if lam>POISSON_EXACT_MAX_LAMBDA and k>lam - POISSON_WINDOW_SIGMA * sigma:
+		# Window would be too wide to sum, use Wilson-Hilferty approximation of the equivalent chi-square
+		nu = 2 * (k + 1)
+		z = ((2 * lam / nu) ** (1 / 3) - (1 - 2 / (9 * nu))) / math.sqrt(2 / (9 * nu))
+		return math.log(max(0.5 * math.erfc(z / math.sqrt(2)), 5e-324))
+	# Terms increase up to the mode then decrease, start from the largest term within [0, k]
+	m = min(k, int(lam))
+	log_pivot = -lam + m * math.log(lam) - math.lgamma(m + 1)
+	total = 1.0
+	term = 1.0
+	for i in range(m, 0, -1):
+		term *= i / lam
+		total += term
+		if term<total * 1e-17: break
+	term = 1.0
+	for i in range(m + 1, k + 1):
+		term *= lam / i
+		total += term
+		if term<total * 1e-17: break
+	return min(log_pivot + math.log(total), 0.0)
+
+@functools.lru_cache(maxsize=4096)
+def required_lambda(CL: float, E: int) -> float:
+	"""Poisson mean N*BER_s at which measuring at most E bit errors gives confidence level CL."""
+	if not 0<CL<1: raise ValueError('Confidence level must be within (0, 1).')
+	if E<=0: return -math.log1p(-CL)
+	lo, hi = 0.0, E + 1.0
+	while -math.expm1(poisson_log_cdf(E, hi))<CL:
+		lo, hi = hi, hi * 2
+	while hi - lo>hi * 1e-12:
+		mid = (lo + hi) / 2
+		if -math.expm1(poisson_log_cdf(E, mid))<CL:
+			lo = mid
+		else:
+			hi = mid
+	return hi
+
+def required_bits(BER_s: float, CL: float, E: int) -> int:
+	"""Minimum bits to transmit so E measured bit errors still give confidence level CL for BER_s."""
+	return math.ceil(required_lambda(float(CL), int(E)) / BER_s)
+
+def plan_test(BER_s: float, CL: float, E: int = 0, data_rate: float | None = None, baudrate: int | None = None, frame_size: int = 10, efficiency: float = 1.0) -> 'TestPlan':
+	"""Required bits and test duration to prove BER_s at confidence level CL, allowing E bit errors.
+
+	Throughput is taken from measured data_rate (bytes/s) when given, else from baudrate scaled by link efficiency.
+	"""
+	if data_rate:
+		bit_rate = data_rate * frame_size
+	elif baudrate:
+		bit_rate = baudrate * efficiency
+	else:
+		raise ValueError('Either data_rate or baudrate is required.')
+	return TestPlan(BER_s, CL, E, required_bits(BER_s, CL, E), bit_rate, frame_size)
 
 def randpattern(n: int | None = None, min: int = 1, max: int = 1024) -> bytes:
 	k = random.randint(min, max) if n is None else n
@@ -33,6 +119,171 @@ def strpattern(n: int | None = None, min: int = 1, max: int = 1024) -> bytes:
 	i = mul + 1 if mod>0 else mul
 	return (STRING_COLLECTION * i)[:k].encode()
 
+def counterpattern(n: int | None = None, min: int = 1, max: int = 1024) -> bytes:
+	k = random.randint(min, max) if n is None else n
+	return (COUNTER_COLLECTION * (k // 256 + 1))[:k]
+
+def binpattern(n: int | None = None, min: int = 1, max: int = 1024) -> bytes:
+	k = random.randint(min, max) if n is None else n
+	return random.randbytes(k)
+
+def prbs_bits(order: int, nbits: int, state: np.ndarray | None = None) -> np.ndarray:
+	"""Generate nbits of PRBS following the order-bit state, where s[k] = s[k-n] ^ s[k-m].
+
+	Since (x^n + x^m + 1)^(2^j) = x^(n*2^j) + x^(m*2^j) + 1 over GF(2), the same recurrence holds with both taps scaled
+	by 2^j. Each numpy step therefore produces up to m*2^j bits at once, with j growing as the sequence grows.
+	"""
+	n, m = order, PRBS_POLYNOMIALS[order]
+	bits = np.empty(nbits + n, dtype=np.uint8)
+	bits[:n] = 1 if state is None else state
+	size = n
+	while size<nbits + n:
+		j = (size // n).bit_length() - 1
+		n2, m2 = n << j, m << j
+		end = min(nbits + n, size + m2)
+		bits[size:end] = bits[size-n2:end-n2] ^ bits[size-m2:end-m2]
+		size = end
+	return bits[n:]
+
+def prbs_bytes(order: int, nbytes: int, state: np.ndarray | None = None) -> tuple[bytes, np.ndarray]:
+	"""Return (nbytes of PRBS packed LSB first as sent on UART line, state to continue the sequence)."""
+	if state is None:
+		# Sequence starts with the all-ones seed itself
+		head = np.ones(order, dtype=np.uint8)
+		bits = np.concatenate((head, prbs_bits(order, nbytes * 8 - order, head)))
+	else:
+		bits = prbs_bits(order, nbytes * 8, state)
+	return np.packbits(bits, bitorder='little').tobytes(), bits[-order:].copy()
+
+@functools.cache
+def prbs_table(order: int, extent: int) -> bytes:
+	"""One PRBS period in bytes (2^n - 1, as 8 is coprime with the period), followed by extent bytes of wrap-around."""
+	period = 2 ** order - 1
+	chunks, state, size = list(), None, 0
+	while size<period + extent:
+		chunk, state = prbs_bytes(order, min(1 << 20, period + extent - size), state)
+		chunks.append(chunk)
+		size += len(chunk)
+	return b''.join(chunks)
+
+
+class PRBS:
+	"""PRBS pattern generator, each call returns the next n bytes of one continuous sequence.
+
+	Orders up to PRBS_MAX_TABLE_ORDER are served zero-copy (memoryview) from a cached period table, longer sequences
+	(PRBS31) are generated in bulk chunks on demand.
+	"""
+
+	def __init__(self, order: int = 15, extent: int = 65536, chunk_size: int = 1 << 20) -> None:
+		if order not in PRBS_POLYNOMIALS: raise ValueError(f'Unsupported PRBS order {order}.')
+		self.order = order
+		self.extent = extent
+		self.chunk_size = chunk_size
+		self.position = 0
+		self._state = None
+		if order<=PRBS_MAX_TABLE_ORDER:
+			self.period = 2 ** order - 1
+			self._buffer = prbs_table(order, extent)
+		else:
+			self.period = None
+			self._buffer = b''
+
+	def __call__(self, n: int | None = None, min: int = 1, max: int = 1024) -> memoryview:
+		k = random.randint(min, max) if n is None else n
+		return self.take(k)
+
+	def take(self, n: int) -> memoryview:
+		if self.period is None:
+			if self.position + n>len(self._buffer):
+				chunk, self._state = prbs_bytes(self.order, max(n, self.chunk_size), self._state)
+				self._buffer = self._buffer[self.position:] + chunk
+				self.position = 0
+			view = memoryview(self._buffer)[self.position:self.position+n]
+			self.position += n
+		elif n<=self.extent:
+			view = memoryview(self._buffer)[self.position:self.position+n]
+			self.position = (self.position + n) % self.period
+		else:
+			# Longer than wrap-around extent, stitch a copy
+			view = memoryview(b''.join(self.take(self.extent) for _ in range(n // self.extent)) + self.take(n % self.extent))
+		return view
+
+
+class PRBSChecker:
+	"""Self-synchronising PRBS receiver, counts bit errors from the received stream only (no copy of sent data).
+
+	Every received bit is checked against s[k-n] ^ s[k-m], a single bit error violates the recurrence three times
+	(at k, k+m and k+n), so error bits are estimated as violations / 3. An error bit is decoded at k when all three
+	violations are present, error bytes are the received bytes holding a decoded error bit.
+	"""
+
+	def __init__(self, order: int) -> None:
+		self.n, self.m = order, PRBS_POLYNOMIALS[order]
+		self.violations = 0
+		self.error_bytes = 0
+		self._tail = np.empty(0, dtype=np.uint8)
+		# Violations of the last n bits wait for their lookahead, _position is the stream bit index of the first one
+		self._lookahead = np.empty(0, dtype=np.uint8)
+		self._position = 0
+		self._last_byte = -1
+
+	def check(self, data: bytes | memoryview, final: bool = False) -> tuple[int, int]:
+		"""Check next received chunk, return the increase of estimated (error bytes, error bits).
+		Error bytes of the last n bits are counted on the next chunk, or now when final.
+		"""
+		bits = np.unpackbits(np.frombuffer(data, dtype=np.uint8), bitorder='little')
+		s = np.concatenate((self._tail, bits))
+		before = self.error_bytes, self.error_bits
+		v = np.zeros(0, dtype=np.uint8)
+		if len(s)>self.n:
+			v = s[self.n:] ^ s[self.n-self.m:len(s)-self.m] ^ s[:len(s)-self.n]
+			self.violations += int(np.count_nonzero(v))
+			# Align violations on received bits, first bits of the very first chunk have no history to check
+			v = np.concatenate((np.zeros(len(bits) - len(v), dtype=np.uint8), v))
+		self._tail = s[-self.n:]
+		self._decode(np.concatenate((self._lookahead, v)), final)
+		return self.error_bytes - before[0], self.error_bits - before[1]
+
+	def _decode(self, v: np.ndarray, final: bool) -> None:
+		n, m = self.n, self.m
+		# Past the end of a final chunk, the lookahead violations are taken as present
+		if final: v = np.concatenate((v, np.ones(n, dtype=np.uint8)))
+		size = len(v) - n
+		if size>0:
+			k = np.flatnonzero(v[:size] & v[m:size+m] & v[n:size+n])
+			if len(k):
+				errored = np.unique((k + self._position) // 8)
+				# Byte of the previous chunk's last error may carry on here
+				self.error_bytes += len(errored) - int(errored[0]==self._last_byte)
+				self._last_byte = int(errored[-1])
+			self._position += size
+		self._lookahead = np.empty(0, dtype=np.uint8) if final else v[max(size, 0):]
+
+	@property
+	def error_bits(self):
+		return (self.violations + 2) // 3
+
+def pattern_generator(name: str = 'string') -> Callable[..., bytes | memoryview]:
+	"""Return frame pattern callable of PATTERNS name, with the same signature as strpattern."""
+	if name.startswith('prbs'): return PRBS(int(name[4:]))
+	return {'string': strpattern, 'random': randpattern, 'counter': counterpattern, 'binary': binpattern}[name]
+
+def stream_pattern(name: str = 'string') -> bytes | PRBS:
+	"""Return periodic pattern (or PRBS) of PATTERNS name which can be checked by LoopBackStream."""
+	if name.startswith('prbs'): return PRBS(int(name[4:]))
+	elif name=='string': return STRING_COLLECTION.encode()
+	elif name=='counter': return COUNTER_COLLECTION
+	raise ValueError(f'Pattern {PATTERNS.get(name, name)} is not periodic, it can not be used in stream mode.')
+
+def mask_pattern(generate: Callable[..., bytes | memoryview], data_bits: int) -> Callable[..., bytes | memoryview]:
+	"""Strip bits which can not be carried by data_bits wide characters, so echo is comparable."""
+	if data_bits>=8: return generate
+	table = bytes(i & ((1 << data_bits) - 1) for i in range(256))
+
+	def masked(*args, **kwargs):
+		return bytes(generate(*args, **kwargs)).translate(table)
+	return masked
+
 def str2compare(data1: str, data2: str):
 	diffdata = dict()
 	i = 0
@@ -62,13 +313,21 @@ def str2compare(data1: str, data2: str):
 	# print(diff_list)
 	return diffdata
 
-def bytes_compare(data1: bytes, data2: bytes):
+def bytes_xor_count(data1: bytes, data2: bytes) -> tuple[np.ndarray, int]:
+	"""Vectorized compare of equal length data, return (index of error bytes, total error bits)."""
 	assert len(data1)==len(data2), 'Data length differ.'
-	diffdata = {i: (data1[i], data2[i]) for i in range(len(data1)) if data1[i]!=data2[i]}
+	xor = np.bitwise_xor(np.frombuffer(data1, dtype=np.uint8), np.frombuffer(data2, dtype=np.uint8))
+	index = np.flatnonzero(xor)
+	return index, int(POPCOUNT_TABLE[xor[index]].sum())
+
+def bytes_compare(data1: bytes, data2: bytes, index: np.ndarray | None = None) -> BytesDiff:
+	if index is None: index, _ = bytes_xor_count(data1, data2)
+	diffdata = {i: (data1[i], data2[i]) for i in index.tolist()}
 	return diffdata
 
 def bytestr_compare(data1: bytes, data2: bytes):
-	str1, str2 = data1.decode(), data2.decode()
+	# Latin-1 maps every byte to one char, so any payload can be diffed
+	str1, str2 = bytes(data1).decode('latin-1'), bytes(data2).decode('latin-1')
 	i1, i2 = 0, 0
 	diffdata = dict()
 	flag = False
@@ -80,7 +339,7 @@ def bytestr_compare(data1: bytes, data2: bytes):
 			i2 += 1
 		elif s[0]=='-':
 			# Char removed from str1
-			diffdata[i1] = (data1[i1], 0)
+			diffdata[i1] = (data1[i1], MISSING_BYTE)
 			flag = True
 			i1 += 1
 		elif s[0]=='+':
@@ -91,40 +350,182 @@ def bytestr_compare(data1: bytes, data2: bytes):
 			else:
 				# Char inserted, this may be a noise on communication link or shifted data
 				# Just ignore it
-				diffdata[i1] = (0, data2[i2])
+				diffdata[i1] = (MISSING_BYTE, data2[i2])
 				# pass
 			flag = False
 			i2 += 1
 		# i += 1
 	return diffdata
 
+def _resync_offset(data1: bytes, data2: bytes, i1: int, i2: int, window: int, anchor: int) -> tuple[int, int]:
+	"""Find the cheapest (skip1, skip2) within window after which both buffers agree again on an anchor of bytes.
+	Candidates are ranked by substitutions plus gap length.
+	"""
+	n1, n2 = len(data1), len(data2)
+	best: tuple[int, int] | None = None
+	best_cost = window + 1
+
+	for d1 in range(min(window, n1 - i1) + 1):
+		# Bytes at i1 and i2 differ, one edit is the least any candidate costs
+		if best_cost<=1: break
+		key = data1[i1+d1:i1+d1+anchor]
+		if len(key)<anchor:
+			# Near the end of data1, the anchor must also be the tail of data2
+			k = n2 - len(key)
+			if k<i2 or k-i2>window or data2[k:]!=key: continue
+		else:
+			k = data2.find(key, i2, i2 + window + anchor)
+			if k<0: continue
+		d2 = k - i2
+		gap = abs(d1 - d2)
+		# Any span with a pair costs at least the first (differing) pair on top of the gap
+		if gap + (d1>0 and d2>0)>best_cost: continue
+		# Substituted pairs plus length of the gap, i.e. edits of the span when aligned on its start
+		cost = sum(a!=b for a, b in zip(data1[i1:i1+d1], data2[i2:i2+d2])) + gap
+		if cost<best_cost or (cost==best_cost and abs(d1-d2)<abs(best[0]-best[1])):
+			best, best_cost = (d1, d2), cost
+
+	if best is None:
+		# Look further ahead for a long run of dropped or inserted bytes, still bounded to keep it linear
+		span = window * 8
+		k1 = data1.find(data2[i2:i2+anchor], i1, i1 + span + anchor) if i2+anchor<=n2 else -1
+		k2 = data2.find(data1[i1:i1+anchor], i2, i2 + span + anchor) if i1+anchor<=n1 else -1
+		if k1>=0 and (k2<0 or k1-i1<=k2-i2):
+			return (k1 - i1, 0)
+		elif k2>=0:
+			return (0, k2 - i2)
+		# No anchor found, consume one byte pair as substitution and try again on next byte
+		return (1, 1)
+	return best
+
+def _align_span(data1: bytes, data2: bytes, i1: int, i2: int, d1: int, d2: int, diffdata: BytesDiff) -> None:
+	"""Record the fewest substitutions, drops and insertions turning data1[i1:i1+d1] into data2[i2:i2+d2].
+	Spans are bounded by the resync window, so the edit distance table stays small.
+	"""
+	a, b = data1[i1:i1+d1], data2[i2:i2+d2]
+	# cost[i][j] is the number of edits of a[i:] against b[j:]
+	cost = [[0] * (d2 + 1) for _ in range(d1 + 1)]
+	for i in range(d1, -1, -1):
+		for j in range(d2, -1, -1):
+			if i==d1: cost[i][j] = d2 - j
+			elif j==d2: cost[i][j] = d1 - i
+			else: cost[i][j] = min(cost[i+1][j+1] + (a[i]!=b[j]), cost[i+1][j] + 1, cost[i][j+1] + 1)
+	i, j = 0, 0
+	while i<d1 or j<d2:
+		if i<d1 and j<d2 and cost[i][j]==cost[i+1][j+1] + (a[i]!=b[j]):
+			# Byte is substituted, or equal
+			if a[i]!=b[j]: diffdata[i1+i] = (a[i], b[j])
+			i += 1
+			j += 1
+		elif i<d1 and cost[i][j]==cost[i+1][j] + 1:
+			# Byte dropped from data1
+			diffdata[i1+i] = (a[i], MISSING_BYTE)
+			i += 1
+		else:
+			# Byte inserted, this may be a noise on communication link
+			diffdata.setdefault(i1+i, (MISSING_BYTE, b[j]))
+			j += 1
+
+def bytes_resync_compare(data1: bytes, data2: bytes, window: int = 16, anchor: int = 4) -> BytesDiff:
+	"""Align data2 to data1 and return substituted, dropped and inserted bytes, keyed by data1 index.
+
+	Unlike bytestr_compare, it works on raw bytes (missing side marked as MISSING_BYTE) and runs in linear time of frame length : equal runs are skipped
+	in chunks, and on mismatch both buffers are resynchronised on the nearest common anchor within a bounded window.
+	"""
+	if isinstance(data1, memoryview): data1 = data1.tobytes()
+	if isinstance(data2, memoryview): data2 = data2.tobytes()
+	n1, n2 = len(data1), len(data2)
+	i1, i2 = 0, 0
+	diffdata = dict()
+	chunk = 64
+
+	while i1<n1 and i2<n2:
+		# Skip equal runs chunk by chunk, then byte by byte
+		while i1+chunk<=n1 and data1[i1:i1+chunk]==data2[i2:i2+chunk]:
+			i1 += chunk
+			i2 += chunk
+		while i1<n1 and i2<n2 and data1[i1]==data2[i2]:
+			i1 += 1
+			i2 += 1
+		if i1>=n1 or i2>=n2: break
+
+		d1, d2 = _resync_offset(data1, data2, i1, i2, window, anchor)
+		if d1 and d2:
+			_align_span(data1, data2, i1, i2, d1, d2, diffdata)
+		else:
+			for k in range(d1):
+				# Byte dropped from data1
+				diffdata[i1+k] = (data1[i1+k], MISSING_BYTE)
+			if d2:
+				# Bytes inserted, this may be a noise on communication link
+				diffdata[i1] = (MISSING_BYTE, data2[i2+d2-1])
+		i1 += d1
+		i2 += d2
+
+	for k in range(i1, n1):
+		diffdata[k] = (data1[k], MISSING_BYTE)
+	if i2<n2:
+		diffdata[n1] = (MISSING_BYTE, data2[-1])
+	return diffdata
+
 
 class LoopBackData:
-	_error_bytes: BytesDiff
+	__slots__ = ('_sent', '_received', 'bits_structure', 'time_delta', 'phases', '_tx_len', '_rx_len', '_error_frames', '_error_bits', '_error_index', '_error_bytes')
+	_error_bytes: BytesDiff | None
+	_error_index: np.ndarray | None
 	_error_bits: int
 
-	def __init__(self, sent: bytes, received: bytes, time_delta: float, bits_struct: BitStruct, **kwargs) -> None:
+	def __init__(self, sent: bytes, received: bytes, time_delta: float, bits_struct: BitStruct, phases: utils.Phases | None = None, **kwargs) -> None:
 		self._sent = sent
 		self._received = received
 		self.bits_structure = bits_struct
 		self.time_delta = time_delta
-		self._error_bytes = bytes_compare(sent, received) if len(sent)==len(received) else bytestr_compare(sent, received)
-		self._error_bits = sum(map(self._count_bit_errors, self._error_bytes.values()))
+		self.phases = phases
+		self._tx_len = len(sent)
+		self._rx_len = len(received)
+
+		if len(sent)==len(received):
+			# Common case, error bytes mapping is only built when requested
+			self._error_index, self._error_bits = bytes_xor_count(sent, received)
+			self._error_bytes = None
+			self._error_frames = len(self._error_index)
+		else:
+			self._error_index = None
+			self._error_bytes = bytes_resync_compare(sent, received)
+			self._error_bits = sum(map(self._count_bit_errors, self._error_bytes.values()))
+			self._error_frames = len(self._error_bytes)
 
 		if os.environ.get('DEBUG'):
 			if len(sent)!=len(received): print('Warning! Data length differed.')
 
+	@classmethod
+	def from_row(cls, store: 'ResultStore', row: int) -> 'LoopBackData':
+		"""View over one row of a ResultStore, payloads are empty if they are no longer retained."""
+		self = cls.__new__(cls)
+		self._sent, self._received = store.payload(row) or (b'', b'')
+		self.bits_structure = store.bits_structure
+		self.time_delta = float(store._time_delta[row])
+		phases = store._phases[row]
+		self.phases = None if phases[0]<0 else tuple(map(int, phases))
+		self._tx_len = int(store._bytes_sent[row])
+		self._rx_len = int(store._bytes_received[row])
+		self._error_frames = int(store._error_frames[row])
+		self._error_bits = int(store._error_bits[row])
+		self._error_index = None
+		self._error_bytes = None
+		return self
+
 	def __str__(self) -> str:
-		return f'tx >> {self._sent}\r\n' +\
-			f'rx >> {self._received}\r\n' +\
+		return f'tx >> {utils.hexdump(self._sent, width=0)}\r\n' +\
+			f'rx >> {utils.hexdump(self._received, width=0)}\r\n' +\
 			f'bytes={self.total_bytes} bits={self.total_bits} error_bytes={self.total_error_frames} error_bits={self.total_error_bits}'
 	
 	def _count_bit_errors(self, pairs: tuple[int, int]) -> int:
 		ctx, crx = pairs
-		if ctx>0 and crx>0:
+		if ctx>=0 and crx>=0:
 			# Byte differed/replaced
 			return (ctx ^ crx).bit_count()
-		elif ctx>0 or crx>0:
+		elif ctx>=0 or crx>=0:
 			# Byte missed or inserted, so all bits are wrong
 			return sum(self.bits_structure)
 		else:
@@ -133,23 +534,42 @@ class LoopBackData:
 
 	def to_dict(self) -> dict[str, Any]:
 		attrs = ['sent', 'received', 'frame_size', 'time_delta', 'total_frames', 'total_bytes', 'total_error_frames', 'total_bits', 'total_error_bits', 'error_bytes']
-		return {attr: getattr(self, attr) for attr in attrs}
+		output = {attr: getattr(self, attr) for attr in attrs}
+		# Payloads may hold any byte value, keep them serializable as hex
+		output['sent'], output['received'] = output['sent'].hex(), output['received'].hex()
+		return output
 
 	@property
-	def sent(self):
-		return self._sent.decode()
+	def sent(self) -> bytes:
+		return bytes(self._sent)
 
 	@property
-	def received(self):
-		return self._received.decode()
+	def received(self) -> bytes:
+		return bytes(self._received)
+
+	@property
+	def has_payload(self) -> bool:
+		return len(self._sent)==self._tx_len and len(self._received)==self._rx_len
 
 	@property
 	def frame_size(self):
 		return sum(self.bits_structure)
 
+	@property
+	def diff(self) -> BytesDiff:
+		if self._error_bytes is None:
+			if not self.has_payload:
+				# Payloads dropped by result store, differences are only known by count
+				return dict()
+			elif len(self._sent)==len(self._received):
+				self._error_bytes = bytes_compare(self._sent, self._received, index=self._error_index)
+			else:
+				self._error_bytes = bytes_resync_compare(self._sent, self._received)
+		return self._error_bytes
+
 	@property
 	def error_bytes(self):
-		return dict(map(lambda i: (i, (chr(self._error_bytes[i][0]), chr(self._error_bytes[i][1]))), self._error_bytes.keys()))
+		return {i: tuple('' if c==MISSING_BYTE else f'{c:02X}' for c in pair) for i, pair in self.diff.items()}
 
 	@property
 	def total_frames(self):
@@ -157,7 +577,11 @@ class LoopBackData:
 
 	@property
 	def total_bytes(self):
-		return len(self._sent)
+		return self._tx_len
+
+	@property
+	def total_bytes_received(self):
+		return self._rx_len
 
 	@property
 	def total_bits(self):
@@ -165,7 +589,7 @@ class LoopBackData:
 
 	@property
 	def total_error_frames(self):
-		return len(self._error_bytes)
+		return self._error_frames
 
 	@property
 	def total_error_bits(self):
@@ -173,68 +597,671 @@ class LoopBackData:
 
 	@property
 	def data_rate(self):
-		return len(self._received) / self.time_delta
+		return self._rx_len / self.time_delta if self.time_delta>0 else 0
+
+	@property
+	def write_time(self) -> float | None:
+		return self.phases[0] / 1e9 if self.phases else None
+
+	@property
+	def first_byte_time(self) -> float | None:
+		"""Seconds from exchange start to first echoed byte, None if unknown or nothing received."""
+		return self.phases[1] / 1e9 if self.phases and self.phases[1]>=0 else None
+
+	@property
+	def last_byte_time(self) -> float | None:
+		return self.phases[2] / 1e9 if self.phases and self.phases[2]>=0 else None
+
+
+class ResultStore:
+	"""Columnar store of exchange results, one typed array per column grown by doubling.
+
+	Raw payloads are only retained for the latest `max_errors` error exchanges and for the latest `ring_size` exchanges,
+	so memory stays bounded on long tests. Items are returned as LoopBackData views over a row.
+	"""
+
+	def __init__(self, bits_struct: BitStruct, capacity: int = 1024, max_errors: int = 1000, ring_size: int = 64) -> None:
+		self.bits_structure = bits_struct
+		self.max_errors = max_errors
+		self._size = 0
+		self._time_delta = np.zeros(capacity, dtype=np.float64)
+		self._bytes_sent = np.zeros(capacity, dtype=np.uint32)
+		self._bytes_received = np.zeros(capacity, dtype=np.uint32)
+		self._error_frames = np.zeros(capacity, dtype=np.uint32)
+		self._error_bits = np.zeros(capacity, dtype=np.uint64)
+		# Write complete, first byte and last byte in nanoseconds, -1 when not measured
+		self._phases = np.full((capacity, 3), -1, dtype=np.int64)
+		self._errors: dict[int, tuple[bytes, bytes]] = dict()
+		self._recent: collections.deque[tuple[bytes, bytes]] = collections.deque(maxlen=ring_size)
+
+	def __len__(self) -> int:
+		return self._size
+
+	def __getitem__(self, item: int | slice) -> LoopBackData | list[LoopBackData]:
+		if isinstance(item, slice):
+			return [LoopBackData.from_row(self, i) for i in range(*item.indices(self._size))]
+		row = item + self._size if item<0 else item
+		if not 0<=row<self._size: raise IndexError('Result index out of range.')
+		return LoopBackData.from_row(self, row)
+
+	def __iter__(self) -> Iterator[LoopBackData]:
+		return (LoopBackData.from_row(self, i) for i in range(self._size))
+
+	@property
+	def capacity(self) -> int:
+		return len(self._time_delta)
+
+	def reserve(self, n: int) -> None:
+		"""Grow columns so at least n rows fit without reallocation."""
+		if n<=self.capacity: return
+		for name in ('_time_delta', '_bytes_sent', '_bytes_received', '_error_frames', '_error_bits', '_phases'):
+			column = getattr(self, name)
+			grown = np.full((n, *column.shape[1:]), -1 if name=='_phases' else 0, dtype=column.dtype)
+			grown[:self._size] = column[:self._size]
+			setattr(self, name, grown)
+
+	def append(self, result: LoopBackData) -> int:
+		row = self._size
+		if row>=self.capacity: self.reserve(max(self.capacity * 2, 1024))
+		self._time_delta[row] = result.time_delta
+		self._bytes_sent[row] = result.total_bytes
+		self._bytes_received[row] = result.total_bytes_received
+		self._error_frames[row] = result.total_error_frames
+		self._error_bits[row] = result.total_error_bits
+		if result.phases is not None: self._phases[row] = result.phases
+		# Views (e.g. into a capture mapping) are copied, so retained payloads never pin their source buffer
+		payload = (bytes(result._sent), bytes(result._received))
+		if result.total_error_frames>0 and self.max_errors>0:
+			self._errors[row] = payload
+			if len(self._errors)>self.max_errors:
+				# Keep the latest, dict preserves insertion order
+				del self._errors[next(iter(self._errors))]
+		self._recent.append(payload)
+		self._size += 1
+		return row
+
+	def payload(self, row: int) -> tuple[bytes, bytes] | None:
+		if row in self._errors: return self._errors[row]
+		offset = row - (self._size - len(self._recent))
+		return self._recent[offset] if offset>=0 else None
+
+	def column(self, name: str) -> np.ndarray:
+		"""Read-only view of one column, trimmed to stored rows."""
+		view = getattr(self, f'_{name}')[:self._size]
+		view.flags.writeable = False
+		return view
+
+	def error_results(self, limit: int | None = None) -> list[LoopBackData]:
+		"""Latest error exchanges whose payloads are still retained, newest first."""
+		rows = list(reversed(self._errors))[:limit]
+		return [LoopBackData.from_row(self, row) for row in rows]
+
+
+def analyse_exchanges(exchanges: list[tuple], bits_struct: BitStruct) -> list[LoopBackData]:
+	"""Compare a batch of (sent, received, time_delta[, phases]) exchanges, safe to run on any worker thread."""
+	return [LoopBackData(sent, received, time_delta, bits_struct, *phases) for sent, received, time_delta, *phases in exchanges]
+
+
+class TestPlan:
+	"""Result of plan_test, bits are counted as line bits (frame_size per byte) like LoopBackTest.total_bits."""
+	__slots__ = ('ber', 'confidence', 'errors', 'bits', 'bit_rate', 'frame_size')
+
+	def __init__(self, ber: float, confidence: float, errors: int, bits: int, bit_rate: float, frame_size: int) -> None:
+		self.ber = ber
+		self.confidence = confidence
+		self.errors = errors
+		self.bits = bits
+		self.bit_rate = bit_rate
+		self.frame_size = frame_size
+
+	def to_dict(self) -> dict[str, Any]:
+		return {attr: getattr(self, attr) for attr in (*self.__slots__, 'frames', 'duration')}
+
+	def exchanges(self, frame_length: int, duration: float | None = None) -> int:
+		"""Expected number of exchanges, used to pre-size result store."""
+		frames = self.frames if duration is None else duration * self.bit_rate / self.frame_size
+		return math.ceil(frames / max(frame_length, 1))
+
+	@property
+	def frames(self):
+		return math.ceil(self.bits / self.frame_size)
+
+	@property
+	def duration(self):
+		return self.bits / self.bit_rate
+
+
+class RunningStat:
+	"""Running count, sum, mean and variance (Welford) of a sample stream, updated in O(1)."""
+	__slots__ = ('count', 'total', 'mean', 'm2', 'min', 'max')
+
+	def __init__(self) -> None:
+		self.count: int = 0
+		self.total: float = 0
+		self.mean: float = 0.0
+		self.m2: float = 0.0
+		self.min: float = math.inf
+		self.max: float = -math.inf
+
+	def push(self, value: float) -> None:
+		self.count += 1
+		self.total += value
+		delta = value - self.mean
+		self.mean += delta / self.count
+		self.m2 += delta * (value - self.mean)
+		if value<self.min: self.min = value
+		if value>self.max: self.max = value
+
+	def merge(self, other: 'RunningStat') -> 'RunningStat':
+		"""Combine with statistic of another sample partition (Chan et al. parallel variance), in place."""
+		if other.count==0: return self
+		if self.count==0:
+			for attr in self.__slots__: setattr(self, attr, getattr(other, attr))
+			return self
+		count = self.count + other.count
+		delta = other.mean - self.mean
+		self.mean += delta * other.count / count
+		self.m2 += other.m2 + delta * delta * self.count * other.count / count
+		self.count = count
+		self.total += other.total
+		self.min = min(self.min, other.min)
+		self.max = max(self.max, other.max)
+		return self
+
+	@property
+	def average(self):
+		# Plain sum / count, so it equals the former sum(map(...)) / len(...) recomputation
+		return self.total / self.count if self.count else 0
+
+	@property
+	def variance(self):
+		return self.m2 / (self.count - 1) if self.count>1 else 0.0
+
+	@property
+	def stdev(self):
+		return math.sqrt(self.variance)
+
+
+class LatencyHistogram:
+	"""HDR style log-bucketed histogram of durations, recorded in nanoseconds with ~0.8% relative precision.
+
+	Each power of two is split into 2^(sub_bits-1) linear sub-buckets, so memory is constant and record() is O(1).
+	"""
+	__slots__ = ('sub_bits', 'counts', 'count', 'min', 'max')
+
+	def __init__(self, sub_bits: int = 7, max_bits: int = 50) -> None:
+		self.sub_bits = sub_bits
+		self.counts = np.zeros(self._index((1 << max_bits) - 1) + 1, dtype=np.int64)
+		self.count: int = 0
+		self.min: int = 0
+		self.max: int = 0
+
+	def _index(self, value: int) -> int:
+		if value<(1 << self.sub_bits): return value
+		e = value.bit_length() - self.sub_bits
+		return (e << (self.sub_bits - 1)) + (value >> e)
+
+	def _bounds(self, index: int) -> tuple[int, int]:
+		"""Lowest and highest value counted in bucket index."""
+		half = 1 << (self.sub_bits - 1)
+		if index<2 * half: return index, index
+		e = index // half - 1
+		low = (index - e * half) << e
+		return low, low + (1 << e) - 1
+
+	def record(self, seconds: float) -> None:
+		self.record_ns(int(seconds * 1e9))
+
+	def record_ns(self, value: int) -> None:
+		value = max(value, 0)
+		self.counts[min(self._index(value), len(self.counts) - 1)] += 1
+		if self.count==0 or value<self.min: self.min = value
+		if value>self.max: self.max = value
+		self.count += 1
+
+	def merge(self, other: 'LatencyHistogram') -> 'LatencyHistogram':
+		if other.count==0: return self
+		self.counts += other.counts
+		self.min = other.min if self.count==0 else min(self.min, other.min)
+		self.max = max(self.max, other.max)
+		self.count += other.count
+		return self
+
+	def percentile(self, p: float) -> float:
+		"""Value in seconds below which p percent of recorded durations fall."""
+		if self.count==0: return 0.0
+		rank = max(math.ceil(p / 100 * self.count), 1)
+		index = int(np.searchsorted(np.cumsum(self.counts), rank))
+		low, high = self._bounds(index)
+		# Bucket midpoint, kept within observed range
+		return min(max((low + high) / 2, self.min), self.max) / 1e9
+
+	def percentiles(self, ps: tuple[float, ...] = (50, 90, 99, 99.9)) -> dict[float, float]:
+		return {p: self.percentile(p) for p in ps}
+
+
+class LoopBackStats:
+	"""Running aggregates of LoopBackData results, updated once per exchange."""
+	__slots__ = ('counter', 'frames_transmitted', 'frames_received', 'bits', 'error_frames', 'error_bits', 'propagation_time', 'data_rate', 'latency', 'write_time', 'first_byte_time')
+
+	def __init__(self) -> None:
+		self.counter: int = 0
+		self.frames_transmitted: int = 0
+		self.frames_received: int = 0
+		self.bits: int = 0
+		self.error_frames: int = 0
+		self.error_bits: int = 0
+		self.propagation_time = RunningStat()
+		self.data_rate = RunningStat()
+		self.latency = LatencyHistogram()
+		self.write_time = RunningStat()
+		self.first_byte_time = RunningStat()
+
+	def push(self, result: LoopBackData) -> None:
+		self.counter += 1
+		self.frames_transmitted += result.total_frames
+		self.frames_received += result.total_bytes_received
+		self.bits += result.total_bits
+		self.error_frames += result.total_error_frames
+		self.error_bits += result.total_error_bits
+		self.propagation_time.push(result.time_delta)
+		self.data_rate.push(result.data_rate)
+		self.latency.record(result.time_delta)
+		if result.phases is not None:
+			self.write_time.push(result.write_time)
+			if result.phases[1]>=0: self.first_byte_time.push(result.first_byte_time)
+
+	def merge(self, other: 'LoopBackStats') -> 'LoopBackStats':
+		"""Combine with aggregates of another partition of exchanges, in place."""
+		for attr in ('counter', 'frames_transmitted', 'frames_received', 'bits', 'error_frames', 'error_bits'):
+			setattr(self, attr, getattr(self, attr) + getattr(other, attr))
+		self.propagation_time.merge(other.propagation_time)
+		self.data_rate.merge(other.data_rate)
+		self.latency.merge(other.latency)
+		self.write_time.merge(other.write_time)
+		self.first_byte_time.merge(other.first_byte_time)
+		return self
+
+
+class LoopBackStream:
+	"""Continuous full-duplex stream : one thread writes a periodic pattern paced at line rate while the calling thread
+	reads the echo into a preallocated buffer and compares it against the expected stream phase.
+
+	Only aggregated counters are kept, transmitted side is updated by the writer thread and received side by the reader.
+	Expected phase and undecided bytes are kept across reads, so a slip (dropped or inserted bytes) is realigned however
+	small the reads are. With a PRBS pattern the echo is checked by a self-synchronising PRBSChecker instead.
+	"""
+
+	def __init__(self, port: utils.SerialPort, stats: LoopBackStats, bits_struct: BitStruct, pattern: bytes | PRBS | None = None, chunk_size: int = 4096, anchor: int = 8, window: int = 16, max_ahead: int | None = None) -> None:
+		self.prbs = pattern if isinstance(pattern, PRBS) else None
+		self.checker = PRBSChecker(pattern.order) if self.prbs else None
+		period = STRING_COLLECTION.encode() if pattern is None or self.prbs else bytes(pattern)
+		# Shortest repeating unit (e.g. counter masked to 7 bits), so an anchor identifies a single phase
+		self.period = next(p for p in range(1, len(period) + 1) if len(period) % p==0 and period==period[p:] + period[:p])
+		period = period[:self.period]
+		# Periodic table, extended so any chunk at any offset is one contiguous slice
+		self.block = period * max(1, chunk_size // self.period)
+		self.table = period * ((chunk_size + self.period - 1) // self.period + 1)
+		self.port = port
+		self.stats = stats
+		self.frame_size = sum(bits_struct)
+		baudrate = getattr(port, 'baudrate', None)
+		self.char_time = self.frame_size / baudrate if baudrate else 0.0
+		self.chunk_size = chunk_size
+		self.anchor = anchor
+		self.window = window
+		self.max_ahead = max_ahead or max(chunk_size, int(STREAM_MAX_AHEAD_TIME / self.char_time) if self.char_time else 0)
+		self.offset = 0
+		self.slips = 0
+		self.dropped = 0
+		self.inserted = 0
+		self._pending = bytearray()
+		self._stop = threading.Event()
+		self._errors: list[Exception] = list()
+
+	@property
+	def in_flight(self) -> int:
+		"""Written bytes whose echo is neither received nor known as dropped."""
+		return self.stats.frames_transmitted - self.stats.frames_received + self.inserted - self.dropped
+
+	def stop(self) -> None:
+		"""Stop writing, run() returns once the echo in flight is drained."""
+		self._stop.set()
+
+	def _next_block(self) -> memoryview:
+		return self.prbs.take(self.chunk_size) if self.prbs else memoryview(self.block)
+
+	def _writer(self, deadline: float) -> None:
+		char = self.char_time
+		# Bytes allowed ahead of line time, about STREAM_BURST_TIME of line
+		burst = max(1, min(self.chunk_size, int(STREAM_BURST_TIME / char))) if char else self.chunk_size
+		t0 = time.monotonic()
+		sent = 0
+		try:
+			block = self._next_block()
+			while not self._stop.is_set():
+				now = time.monotonic()
+				if now>=deadline: break
+				credit = int((now - t0) / char) + burst - sent if char else len(block)
+				if credit<(burst + 1) // 2 or self.in_flight>=self.max_ahead:
+					# Wait for line (or echo) to catch up instead of piling data in port buffers
+					time.sleep(min(max((burst - credit) * char / 2, STREAM_POLL_INTERVAL), deadline - now))
+					continue
+				# Raw socket may accept only part of the block, keep the stream continuous
+				n = self.port.write(block[:credit])
+				block = block[n:] or self._next_block()
+				sent += n
+				self.stats.frames_transmitted += n
+				self.stats.bits += n * self.frame_size
+		except Exception as err:
+			self._errors.append(err)
+
+	def check(self, view: memoryview, final: bool = False) -> None:
+		"""Compare received chunk against expected stream, realign on slip (dropped or inserted bytes).
+		Bytes after a mismatch wait for enough lookahead to tell a slip from bit errors, final decides them anyway.
+		"""
+		# Stream has no exchanges, counter stays 0 whatever the size of reads
+		self.stats.frames_received += len(view)
+		if self.checker:
+			frames, bits = self.checker.check(view, final)
+			self.stats.error_frames += frames
+			self.stats.error_bits += bits
+			return
+		data = self._pending
+		data += view
+		size = len(data)
+		pos = 0
+		while pos<size:
+			n = min(size - pos, self.chunk_size)
+			index, _ = bytes_xor_count(self.table[self.offset:self.offset+n], bytes(data[pos:pos+n]))
+			e = int(index[0]) if len(index)>0 else n
+			self.offset = (self.offset + e) % self.period
+			pos += e
+			if e==n: continue
+			if size - pos<self.window + self.anchor and not final: break
+			pos += self._resync(data, pos)
+		del data[:pos]
+
+	def _resync(self, data: bytearray, pos: int) -> int:
+		"""Account the mismatch at pos, align expected phase to what follows and return bytes consumed."""
+		P, A = self.period, self.anchor
+		off = self.offset
+		rest = bytes(data[pos+1:pos+1+A])
+		if rest==self.table[off+1:off+1+len(rest)]:
+			# Stream agrees again right after, a substituted byte
+			self._count_substituted(data[pos:pos+1])
+			self.offset = (off + 1) % P
+			return 1
+		for d in range(min(self.window, len(data) - pos - A) + 1):
+			k = self.table.find(bytes(data[pos+d:pos+d+A]), 0, P + A - 1)
+			if k<0: continue
+			# Phase of the anchor against the phase expected without slip, the smaller way round
+			shift = (k - off - d) % P
+			if shift<=P // 2:
+				self._count_substituted(data[pos:pos+d])
+				self._count_lost(shift)
+			else:
+				inserted = P - shift
+				self._count_substituted(data[pos:pos+max(d-inserted, 0)])
+				self.inserted += inserted
+				self.stats.error_frames += inserted
+				self.stats.error_bits += inserted * self.frame_size
+			self.slips += shift>0
+			self.offset = k
+			return d
+		# No anchor within window, consume one byte as substitution and try again on next byte
+		self._count_substituted(data[pos:pos+1])
+		self.offset = (off + 1) % P
+		return 1
+
+	def _count_substituted(self, received: bytearray) -> None:
+		if not received: return
+		index, bits = bytes_xor_count(self.table[self.offset:self.offset+len(received)], bytes(received))
+		self.stats.error_frames += len(index)
+		self.stats.error_bits += bits
+
+	def _count_lost(self, n: int) -> None:
+		# Missing bytes are counted as whole error frames, as in frame based test
+		if n<=0: return
+		self.dropped += n
+		self.stats.error_frames += n
+		self.stats.error_bits += n * self.frame_size
+
+	def run(self, duration: float, timeout: float = 3) -> None:
+		buffer = memoryview(bytearray(self.chunk_size))
+		deadline = time.monotonic() + duration
+		writer = threading.Thread(target=self._writer, args=(deadline,), name='serial-stream-writer', daemon=True)
+		writer.start()
+		t_last = time.monotonic()
+		drain_end = None
+		try:
+			while True:
+				if drain_end is None and not writer.is_alive():
+					# Echo in flight is due within its line time, plus a margin for link latency
+					drain_end = time.monotonic() + max(self.in_flight, 0) * self.char_time + min(timeout, STREAM_DRAIN_MARGIN)
+				t = time.monotonic()
+				if drain_end is not None and (self.in_flight<=0 or t>=drain_end): break
+				n = utils.readinto_ready(self.port, buffer, min((drain_end or deadline) - t, STREAM_POLL_INTERVAL * 50))
+				t = time.monotonic()
+				if n>0:
+					self.check(buffer[:n])
+					self.stats.data_rate.push(n / (t - t_last) if t>t_last else 0)
+					t_last = t
+				elif t - t_last>=timeout and self.in_flight>0:
+					# Nothing came back within data timeout, echo in flight is lost and writer may go on
+					self._count_lost(self.in_flight)
+					t_last = t
+		finally:
+			self._stop.set()
+			writer.join()
+
+		self.check(buffer[:0], final=True)
+		self._count_lost(self.in_flight)
+		if self._errors: raise self._errors[0]
 
 
 class LoopBackTest:
-	_results: list[LoopBackData]
+	_results: ResultStore
+	_stats: LoopBackStats
 
 	def __init__(self, port: utils.SerialPort, data: list[tuple] = [], **kwargs) -> None:
 		self._rawdata = data
 		self._calc_baudrate: int = None
+		self._stats = LoopBackStats()
 		self.port = port
 		self.is_running: bool = False
 		self.progress: float = 0.0
 		self.due_time: float = 0.0
+		self.stop_reason: str | None = None
+		self._target: tuple[float, float, float, float] | None = None
 		# Process data if any
-		self._results = self.process_all() if data else list()
+		self._results = self.process_all() if data else ResultStore(self.bits_structure)
 
 	def __getitem__(self, item):
 		return self.results[item]
 
 	def _reinitalize(self) -> None:
 		self._rawdata = list()
-		self._results = list()
+		self._results = ResultStore(self.bits_structure)
+		self._stats = LoopBackStats()
 		self.progress = 0.0
 		self.due_time = 0.0
+		self.stop_reason = None
+		self._target = None
 
-	async def _run(self, once: bool, duration: float, frame_length: int | None, timeout: float, **kwargs) -> None:
+	async def _run(self, once: bool, duration: float, frame_length: int | None, timeout: float, window: int = 1, pattern: str = 'string', target_cl: float | None = None, desired_ber: float = 1e-6, reserve: int | None = None, capture = None, analysis_executor = None, **kwargs) -> None:
 		self._reinitalize()
+		if reserve: self._results.reserve(min(reserve, RESULT_RESERVE_MAX))
+		t0 = time.monotonic()
+		if target_cl is not None: self._target = (target_cl, desired_ber, t0, duration)
 		dkwargs = dict()
 		if 'min_length' in kwargs: dkwargs['min'] = utils.pop_dict(kwargs, 'min_length')
 		if 'max_length' in kwargs: dkwargs['max'] = utils.pop_dict(kwargs, 'max_length')
-
-		t0 = time.time()
-		# Executor may defined in kwargs
-		while time.time() - t0 <= duration:
-			sr = await utils.async_serial_sendrcv(port=self.port, data=strpattern(frame_length, **dkwargs), timeout=timeout, **kwargs)
-			self.process(*sr)
-			self._rawdata.append(sr)
-			self.progress = (time.time() - t0) / duration
-			self.due_time = round(duration - time.time() + t0, 1)
-			if once: break
+		generate = mask_pattern(pattern_generator(pattern), self.data_bits)
+		if window>1 and not once and isinstance(self.port, utils.AsyncTCPRawSocket): raise ValueError('Pipelined window requires a blocking port.')
+		# I/O stage feeds analysis stage through a bounded queue, it only waits when analysis falls far behind
+		queue = asyncio.Queue(maxsize=ANALYSIS_QUEUE_SIZE)
+		writer = capture
+		if isinstance(capture, (str, os.PathLike)):
+			from .capture import CaptureWriter
+			writer = CaptureWriter(capture, self.bits_structure)
+		analysis = asyncio.ensure_future(self._analyse(queue, analysis_executor, capture=writer))
+
+		try:
+			if window>1 and not once:
+				await self._run_window(queue, analysis, t0, duration, frame_length, timeout, window, generate, dkwargs, **kwargs)
+			else:
+				# Executor may defined in kwargs
+				while time.monotonic() - t0 <= duration and self.stop_reason is None:
+					sr = await utils.async_serial_sendrcv(port=self.port, data=generate(frame_length, **dkwargs), timeout=timeout, **kwargs)
+					if not await self._enqueue(queue, sr, analysis): break
+					self._update_progress(t0, duration)
+					if once: break
+		finally:
+			await self._enqueue(queue, None, analysis)
+			try:
+				await analysis
+			finally:
+				# Writer given by caller is only flushed, it may collect several runs
+				if writer is not capture:
+					writer.close()
+				elif writer is not None:
+					writer.flush()
 		return self.results
 
-	def process_all(self) -> list[LoopBackData]:
-		results = [LoopBackData(*data, self.bits_structure) for data in self._rawdata]
+	async def _enqueue(self, queue: asyncio.Queue, item: tuple | None, analysis: asyncio.Future) -> bool:
+		"""Hand item to analysis stage, False once that stage has ended, so I/O stage stops instead of waiting on it forever."""
+		if analysis.done(): return False
+		if not queue.full():
+			queue.put_nowait(item)
+			return True
+		put = asyncio.ensure_future(queue.put(item))
+		await asyncio.wait((put, analysis), return_when=asyncio.FIRST_COMPLETED)
+		if put.done(): return True
+		put.cancel()
+		return False
+
+	async def _run_window(self, queue: asyncio.Queue, analysis: asyncio.Future, t0: float, duration: float, frame_length: int | None, timeout: float, window: int, generate: Callable, dkwargs: dict, executor = None, **kwargs) -> None:
+		loop = asyncio.get_running_loop()
+
+		def frames():
+			while time.monotonic() - t0 <= duration and self.stop_reason is None:
+				yield generate(frame_length, **dkwargs)
+
+		def exchange():
+			# Blocking pipelined I/O runs in executor, results are handed to the analysis queue on the event loop
+			for sr in utils.serial_sendrcv_window(self.port, frames(), window=window, timeout=timeout):
+				if not asyncio.run_coroutine_threadsafe(self._enqueue(queue, sr, analysis), loop).result(): return
+				loop.call_soon_threadsafe(self._update_progress, t0, duration)
+
+		await utils.run_in_thread(executor, exchange)
+
+	async def _analyse(self, queue: asyncio.Queue, executor = None, capture = None) -> None:
+		"""Analysis stage, compares queued exchanges in batches on executor and pushes results on the event loop.
+		Raw exchanges are appended to capture writer (if any) on the same worker, before they are compared.
+		"""
+		loop = asyncio.get_running_loop()
+		bits_struct = self.bits_structure
+
+		def work(batch: list[tuple]) -> list[LoopBackData]:
+			if capture is not None: capture.write_many(batch)
+			return analyse_exchanges(batch, bits_struct)
+
+		done = False
+		while not done:
+			batch = [await queue.get()]
+			while not queue.empty():
+				batch.append(queue.get_nowait())
+			if batch[-1] is None:
+				done = True
+				batch.pop()
+			if not batch: continue
+			try:
+				results = await loop.run_in_executor(executor, work, batch)
+				for result in results:
+					self._push(result)
+			except Exception:
+				# Ends this stage, I/O stage sees it through _enqueue and stops instead of blocking on the queue
+				self.stop_reason = 'error'
+				raise
+
+	def _update_progress(self, t0: float, duration: float) -> None:
+		self.progress = min((time.monotonic() - t0) / duration, 1.0)
+		self.due_time = max(round(duration - time.monotonic() + t0, 1), 0.0)
+
+	def process_all(self) -> ResultStore:
+		results = ResultStore(self.bits_structure, capacity=max(len(self._rawdata), 1))
+		self._stats = LoopBackStats()
+		for result in analyse_exchanges(self._rawdata, self.bits_structure):
+			results.append(result)
+			self._stats.push(result)
 		return results
 
-	def process(self, tx_data: bytes, rx_data: bytes, t_delta: float) -> LoopBackData:
-		result = LoopBackData(tx_data, rx_data, t_delta, self.bits_structure)
+	def process(self, tx_data: bytes, rx_data: bytes, t_delta: float, phases: utils.Phases | None = None) -> LoopBackData:
+		result = LoopBackData(tx_data, rx_data, t_delta, self.bits_structure, phases)
+		self._push(result)
+		return result
+
+	def _push(self, result: LoopBackData) -> None:
 		self._results.append(result)
+		self._stats.push(result)
 
 		if self.avg_data_rate>0 and self._calc_baudrate is None:
 			# Set calculated baudrate based on transmission data rate
-			self._calc_baudrate = utils.guess_baudrate(self.avg_data_rate, self.frame_size)
-		return result
+			self._calc_baudrate = utils.guess_baudrate(self.avg_data_rate, self.frame_size, custom=(self.port.baudrate,))
+		if self._target is not None and self.stop_reason is None: self.stop_reason = self._check_target()
+
+	def _check_target(self) -> str | None:
+		"""Early stop reason once target confidence level is reached, or can no longer be reached within test duration."""
+		target_cl, desired_ber, t0, duration = self._target
+		need = required_bits(desired_ber, target_cl, self.total_error_bits)
+		if self.total_bits>=need: return 'confidence'
+		elapsed = time.monotonic() - t0
+		if self.total_error_bits>0 and elapsed>0:
+			# Measured errors push required bits beyond what remaining time can transmit at current rate
+			if self.total_bits * duration / elapsed<need: return 'unreachable'
+		return None
+
+	@utils.toggle_attr(name='is_running')
+	async def run_stream(self, duration: float, timeout: float = 3, pattern: str = 'string', target_cl: float | None = None, desired_ber: float = 1e-6, executor = None, **kwargs) -> LoopBackStats:
+		"""Continuous stream test, only aggregated counters are updated (no per-frame results)."""
+		self._reinitalize()
+		if isinstance(self.port, utils.AsyncTCPRawSocket): raise ValueError('Stream test requires a blocking port.')
+		period = stream_pattern(pattern)
+		if self.data_bits<8:
+			if isinstance(period, PRBS): raise ValueError('PRBS stream requires 8 data bits.')
+			period = mask_pattern(lambda: period, self.data_bits)()
+		stream = LoopBackStream(self.port, self._stats, self.bits_structure, pattern=period, **kwargs)
+		t0 = time.monotonic()
+		if target_cl is not None: self._target = (target_cl, desired_ber, t0, duration)
+		task = asyncio.ensure_future(utils.run_in_thread(executor, stream.run, duration, timeout))
+
+		while not task.done():
+			self._update_progress(t0, duration)
+			if self._target is not None and self.stop_reason is None:
+				self.stop_reason = self._check_target()
+			if self.stop_reason: stream.stop()
+			await asyncio.wait([task], timeout=0.2)
+
+		task.result()
+		if self.avg_data_rate>0:
+			self._calc_baudrate = utils.guess_baudrate(self.avg_data_rate, self.frame_size, custom=(self.port.baudrate,))
+		return self._stats
+
+	def stop(self) -> None:
+		"""Ask running test to stop after current exchange, results so far are kept."""
+		if self.stop_reason is None: self.stop_reason = 'stopped'
 
 	@utils.toggle_attr(name='is_running')
 	async def run_once(self, frame_length: int | None = None, timeout: float = 3, **kwargs) -> None:
 		return await self._run(once=True, duration=3, frame_length=frame_length, timeout=timeout, **kwargs)
 
 	@utils.toggle_attr(name='is_running')
-	async def run_for(self, duration: float, frame_length: int | None = None, timeout: float = 3, **kwargs) -> None:
-		return await self._run(once=False, duration=duration, frame_length=frame_length, timeout=timeout, **kwargs)
+	async def run_for(self, duration: float, frame_length: int | None = None, timeout: float = 3, window: int = 1, pattern: str = 'string', target_cl: float | None = None, desired_ber: float = 1e-6, **kwargs) -> None:
+		"""Run for duration, or stop earlier once target_cl for desired_ber is reached or became unreachable.
+		Raw exchanges are also saved when capture (file path or CaptureWriter) is given.
+		"""
+		return await self._run(once=False, duration=duration, frame_length=frame_length, timeout=timeout, window=window, pattern=pattern, target_cl=target_cl, desired_ber=desired_ber, **kwargs)
 
 	@property
 	def results(self):
@@ -242,7 +1269,11 @@ class LoopBackTest:
 
 	@property
 	def counter(self):
-		return len(self.results)
+		return self._stats.counter
+
+	@property
+	def stats(self):
+		return self._stats
 
 	@property
 	def start_bits(self):
@@ -270,11 +1301,11 @@ class LoopBackTest:
 
 	@property
 	def total_frames_transmitted(self):
-		return sum(map(lambda d: d.total_frames, self.results)) if self.results else 0
+		return self._stats.frames_transmitted
 
 	@property
 	def total_frames_received(self):
-		return sum(map(lambda d: len(d.received), self.results)) if self.results else 0
+		return self._stats.frames_received
 
 	@property
 	def total_frames_lost(self):
@@ -282,15 +1313,15 @@ class LoopBackTest:
 
 	@property
 	def total_bits(self):
-		return sum(map(lambda d: d.total_bits, self.results)) if self.results else 0
+		return self._stats.bits
 
 	@property
 	def total_error_frames(self):
-		return sum(map(lambda d: d.total_error_frames, self.results)) if self.results else 0
+		return self._stats.error_frames
 
 	@property
 	def total_error_bits(self):
-		return sum(map(lambda d: d.total_error_bits, self.results)) if self.results else 0
+		return self._stats.error_bits
 
 	@property
 	def bit_error_rate(self):
@@ -305,69 +1336,60 @@ class LoopBackTest:
 
 	@property
 	def avg_propagation_time(self):
-		return sum(map(lambda d: d.time_delta, self.results)) / self.counter if self.counter else 0
+		return self._stats.propagation_time.average
+
+	@property
+	def std_propagation_time(self):
+		return self._stats.propagation_time.stdev
+
+	@property
+	def min_propagation_time(self):
+		return self._stats.propagation_time.min if self._stats.propagation_time.count else 0
+
+	@property
+	def max_propagation_time(self):
+		return self._stats.propagation_time.max if self._stats.propagation_time.count else 0
+
+	@property
+	def p50_propagation_time(self):
+		return self._stats.latency.percentile(50)
+
+	@property
+	def p99_propagation_time(self):
+		return self._stats.latency.percentile(99)
+
+	@property
+	def p999_propagation_time(self):
+		return self._stats.latency.percentile(99.9)
+
+	@property
+	def latency(self):
+		return self._stats.latency
 
 	@property
 	def avg_data_rate(self):
-		return sum(map(lambda d: d.data_rate, self.results)) / self.counter if self.counter else 0
+		return self._stats.data_rate.average
 
 	@property
 	def avg_frames_received(self):
 		return self.total_frames_received / self.counter if self.counter else 0
 
+	@property
+	def avg_write_time(self):
+		return self._stats.write_time.average
+
+	@property
+	def avg_first_byte_time(self):
+		return self._stats.first_byte_time.average
+
 	@property
 	def avg_travel_time(self):
-		if self._calc_baudrate is None:
+		if self._stats.first_byte_time.count>0:
+			# Measured time to first echoed byte, less the time that byte spends on the line
+			return max(self.avg_first_byte_time - (self.frame_size / self._calc_baudrate if self._calc_baudrate else 0), 0.0)
+		elif self._calc_baudrate is None or self._stats.propagation_time.count==0:
+			# Stream test has no per-exchange timing
 			return 0
 		else:
 			return self.avg_propagation_time - (self.avg_frames_received / self._calc_baudrate * self.frame_size)
 
-
-if __name__=='__main__':
-	bits_struct = (1, 8, 0, 1)
-	char = b'$'
-
-	def sub(s: bytes, ix: list[int], x: bytes | list[bytes]):
-		out = s
-		n = 0
-		if isinstance(x, list):
-			for i in range(len(ix)):
-				out = out.replace(chr(out[ix[i]+n]).encode(), x[i], 1)
-				n += len(x[i]) - 1
-		else:
-			for i in ix:
-				out = out.replace(chr(out[i]+n).encode(), x, 1)
-				n += len(x) - 1
-		return out
-	
-	def run(b1, b2):
-		t0 = time.time_ns()
-		res = LoopBackData(b1, b2, 0.0, bits_struct)
-		t1 = time.time_ns()
-		dt = (t1-t0)/1000
-		print('', res, sep='\n')
-		print(res.error_bytes)
-		# print(f't_total={dt}us', f'count={res.total_error_frames}', f'error={res.total_error_bits}')
-
-	def rand_index(n: int, max: int):
-		gen = list()
-		while len(gen)<n:
-			x = random.randint(0, max)
-			if x not in gen: gen.append(x)
-		return gen
-
-	length = 100
-	n_err = 3
-	# x = randpattern(40)
-	x = strpattern(length)
-	ixs = rand_index(n_err, 100)
-	y1 = sub(x, ixs, char)
-	y2 = sub(x, ixs, b'')
-	y3 = sub(x, ixs, char*2)
-	# print(x)
-	# print(y)
-	# x = b'NDVplmCsYNITnMXBy3QzIdkuQ9fS9h4PJ3waTueAuxpxAGnAyNmbXNWisiltGf6qe0lUqZooALlGQSGYKqoCvKSPYddUVkVQ2DAeI8oOFPQTMEFEdaEeXl7hOOAUAqmba952yv20iivTy8BodsLwJrm5qOOTgnU3XECipQ2nySHSa6E5qn1NjvISXJh7xbclwR2V8BTFtBFcCENGaRQRch4s62DiMtK2eO99LdoUAec8tpGh6xyIwZtZDugZM4e'
-	# y = b'NDVppmCsYNITnMBy3Q#zIdkuQ9fS9h4PJ3waTueAuxpxAGnAyNmbNWisiptGf6qe0pUqZooALpGQSGYKqoCvKSPYddUVkVQ2DAeI8oOFPQTMEFEdaEep7hOOAUAqmba952yv20iivTy8BodsLwJrm5qOOTgnU3ECipQ2nySHSa6E5qn1NjvISJh7xbcpwR2V8BTFtBFcCENGaRQRch4s62DiMtK2eO99LdoUAec8tpGh6xyIwZtZDugZM4e'
-
-	for y in [y1, y2, y3]:
-		run(x, y)
\ No newline at end of file
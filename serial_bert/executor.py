@@ -0,0 +1,107 @@
+import threading, time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable
+
+
+ANALYSIS_WORKERS: int = 2
+
+
+class TrackedExecutor(ThreadPoolExecutor):
+	"""ThreadPoolExecutor which keeps queue depth and busy time of its workers."""
+
+	def __init__(self, max_workers: int = 1, thread_name_prefix: str = '') -> None:
+		super().__init__(max_workers=max_workers, thread_name_prefix=thread_name_prefix)
+		self._stats_lock = threading.Lock()
+		self.queued: int = 0
+		self.running: int = 0
+		self.completed: int = 0
+		self.busy_time: float = 0.0
+		self.created: float = time.monotonic()
+
+	def submit(self, fn: Callable[..., Any], /, *args, **kwargs) -> Future:
+		def tracked():
+			with self._stats_lock:
+				self.queued -= 1
+				self.running += 1
+			t0 = time.perf_counter()
+			try:
+				return fn(*args, **kwargs)
+			finally:
+				dt = time.perf_counter() - t0
+				with self._stats_lock:
+					self.running -= 1
+					self.completed += 1
+					self.busy_time += dt
+
+		with self._stats_lock:
+			self.queued += 1
+		try:
+			return super().submit(tracked)
+		except RuntimeError:
+			with self._stats_lock:
+				self.queued -= 1
+			raise
+
+	@property
+	def stats(self) -> dict[str, Any]:
+		with self._stats_lock:
+			uptime = time.monotonic() - self.created
+			return {
+				'workers': self._max_workers,
+				'queued': self.queued,
+				'running': self.running,
+				'completed': self.completed,
+				'busy_time': round(self.busy_time, 6),
+				'utilization': round(self.busy_time / (uptime * self._max_workers), 4) if uptime>0 else 0.0,
+			}
+
+
+class ExecutorManager:
+	"""Application scoped executors : one pinned I/O thread per port and a small shared pool for analysis.
+
+	Executors are created lazily, so the manager also works without start() outside of NiceGUI app.
+	"""
+
+	def __init__(self, analysis_workers: int = ANALYSIS_WORKERS) -> None:
+		self.analysis_workers = analysis_workers
+		self._lock = threading.Lock()
+		self._io: dict[str, TrackedExecutor] = dict()
+		self._analysis: TrackedExecutor | None = None
+
+	def start(self) -> None:
+		# Spawn analysis threads up front, so the first test does not pay for it
+		for _ in range(self.analysis_workers):
+			self.analysis.submit(int)
+
+	def shutdown(self, wait: bool = True) -> None:
+		with self._lock:
+			executors = [*self._io.values(), self._analysis]
+			self._io.clear()
+			self._analysis = None
+		for executor in executors:
+			if executor is not None: executor.shutdown(wait=wait, cancel_futures=True)
+
+	def io(self, name: str) -> TrackedExecutor:
+		"""Single thread executor pinned to port name, blocking port calls are serialized on it."""
+		name = ''.join(name.split())
+		with self._lock:
+			if name not in self._io:
+				self._io[name] = TrackedExecutor(1, thread_name_prefix=f'io-{name}')
+			return self._io[name]
+
+	@property
+	def analysis(self) -> TrackedExecutor:
+		with self._lock:
+			if self._analysis is None:
+				self._analysis = TrackedExecutor(self.analysis_workers, thread_name_prefix='analysis')
+			return self._analysis
+
+	@property
+	def stats(self) -> dict[str, dict[str, Any]]:
+		with self._lock:
+			executors = {f'io:{name}': executor for name, executor in self._io.items()}
+			if self._analysis is not None: executors['analysis'] = self._analysis
+		return {name: executor.stats for name, executor in executors.items()}
+
+
+executors = ExecutorManager()
@@ -1,9 +1,10 @@
-import asyncio, os, time
-from concurrent.futures import ThreadPoolExecutor
+import asyncio, functools, math, os, time
 from typing import Any, Callable, Iterator, Literal, Optional, Self, TypeAlias
 
 from nicegui import app, ui, events
-from . import core, state, utils
+from . import core, multiport, state, utils
+from .executor import executors
+from .scheduler import Job, JobCancelled, scheduler
 
 SpinnerType: TypeAlias = Literal['audio', 'bar', 'balls', 'box', 'clock', 'comment', 'cube', 'dots', 'facebook', 'gears', 'grid', 'hearts', 'hourglass', 'infinity', 'ios', 'orbit', 'oval', 'pie', 'puff', 'radio', 'rings', 'tail']
 
@@ -22,7 +23,8 @@ ui_section = ui.item_section.default_classes('align-stretch')
 ui_select = ui.select.default_props('dense outlined square stack-label options-dense')
 ui_input = ui.input.default_props('dense outlined square stack-label')
 ui_menu_label = ui.item_label.default_classes('text-sm')
-dark_mode = ui.dark_mode()
+app.on_startup(executors.start)
+app.on_shutdown(executors.shutdown)
 
 def timediff(t0: float, digit: int | None = None) -> float:
 	return time.time() - t0 if digit is None else round(time.time() - t0, digit)
@@ -39,6 +41,14 @@ def timefrmt(t: float, digit: int = 3, unit: Literal['s', 'ms', 'us', 'ns'] = 's
 		# Too small for current unit
 		return timefrmt(t*1000, digit, unit_step[ix_unit+1])
 
+def durationfrmt(t: float) -> str:
+	if t>=86400 * 365:
+		return f'{t / (86400 * 365):.1f} years'
+	days, rem = divmod(int(round(t)), 86400)
+	hours, rem = divmod(rem, 3600)
+	minutes, seconds = divmod(rem, 60)
+	return (f'{days}d ' if days else '') + f'{hours:02d}:{minutes:02d}:{seconds:02d}'
+
 def group_label(label: str):
 	ui.label(label).classes('font-bold whitespace-nowrap')
 	ui.separator().classes('w-fill')
@@ -221,6 +231,8 @@ class GUI(ui.card):
 		self.state = state.MainState()
 		self.loop = asyncio.get_event_loop()
 		self.test: core.LoopBackTest | None = None
+		self.job: Job | None = None
+		self.dark_mode = ui.dark_mode()
 		self.loading_spinner = LoadingSpinner()
 		self.dialog_prompt = self._render_dialog_prompt()
 		self.about = self._render_about()
@@ -239,9 +251,9 @@ class GUI(ui.card):
 				NavButton('Reset', icon='restart_alt', on_click=self.reset_parameter)\
 					.tooltip('Reset parameter to default')
 				ui.separator().props('vertical')
-				NavButton('', icon='', on_click=lambda: dark_mode.toggle())\
-					.bind_icon_from(dark_mode, 'value', backward=lambda dark: 'light_mode' if dark else 'dark_mode')\
-					.bind_text_from(dark_mode, 'value', backward=lambda dark: 'Light' if dark else 'Dark')\
+				NavButton('', icon='', on_click=lambda: self.dark_mode.toggle())\
+					.bind_icon_from(self.dark_mode, 'value', backward=lambda dark: 'light_mode' if dark else 'dark_mode')\
+					.bind_text_from(self.dark_mode, 'value', backward=lambda dark: 'Light' if dark else 'Dark')\
 					.tooltip('Switch to Dark/Light mode')
 				ui.separator().props('vertical')
 				NavButton('Doc', icon='description', on_click=lambda: ui.navigate.to('/documentation', new_tab=True))\
@@ -266,13 +278,29 @@ class GUI(ui.card):
 		def host_defined(cfg: state.SerialConfig):
 			return cfg.remote_ip is not None and cfg.remote_port is not None
 
+		# Custom rates typed in this session only, the standard table is shared by all clients
+		custom_rates: set[int] = {self.config.baudrate}
+
+		def change_baudrate(e: events.ValueChangeEventArguments):
+			# Typed custom rate comes as string, it is validated and offered again in this session
+			try:
+				rate = utils.validate_baudrate(e.value)
+				custom_rates.add(rate)
+			except ValueError as err:
+				ui.notify(f'Error! {err}', color='negative')
+				rate = 9600	# default
+			# Sender is used as the handler also fires while the select is being built
+			e.sender.options = utils.baudrate_options(*custom_rates)
+			e.sender.value = rate
+			e.sender.update()
+
 		with UIColumn():
 			self.ui_group_label(text='Serial Parameter', group_name='serial_param', can_toggle=False)
 			with ui.list().bind_visibility_from(self.state, 'serial_param_visible').props('dense'):
 				with ui_item():
 					with ui_section():
 						with UIRow(overflow='visible'):
-							sradio = ui.radio(options={'serial_com': 'Serial COM', 'virtual_com': 'Raw Socket'})\
+							sradio = ui.radio(options={'serial_com': 'Serial COM', 'virtual_com': 'Raw Socket', 'multi_port': 'Multi Port'})\
 								.bind_value(self.state, 'mode')\
 								.props('dense inline')\
 								.classes('text-sm')
@@ -322,12 +350,20 @@ class GUI(ui.card):
 								.props('dense flat rounded')\
 								.tooltip('Check')
 							ui.spinner('ios').bind_visibility_from(self.state, 'checking_host')
+				with ui_item().bind_visibility_from(sradio, 'value', value='multi_port'):
+					with ui_section():
+						ui.textarea(label='Ports', placeholder='COM3-6, /dev/ttyUSB0, 192.168.1.10:4001-4016')\
+							.bind_value(self.config, 'port_list')\
+							.props('dense outlined square stack-label autogrow')\
+							.classes('w-full')\
+							.tooltip('Serial devices and/or host:port, ranges are expanded')
 				with ui_item():
 					with ui_section():
 						with UIRow():
-							ui_select(options=utils.BAUD_RATES, label='Baud Rate')\
+							ui_select(options=utils.baudrate_options(*custom_rates), label='Baud Rate', with_input=True, new_value_mode='add-unique', on_change=change_baudrate)\
 								.bind_value(self.config, 'baudrate')\
-								.classes('w-2/5')
+								.classes('w-2/5')\
+								.tooltip('Type a custom rate and press Enter')
 							ui_select(options=utils.DATA_BITS, label='Data Bit')\
 								.bind_value(self.config, 'data_bit')\
 								.classes('w-1/5')
@@ -372,6 +408,17 @@ class GUI(ui.card):
 			finally:
 				return output
 
+		def fw_frame_window(input: str | int):
+			try:
+				i = int(input)
+				if i<1 or i>64: raise ValueError
+				output = i
+			except ValueError:
+				ui.notify('Error! Value must be within range 1-64.', color='negative')
+				output = 1	# default
+			finally:
+				return output
+
 		def fw_test_duration(input: str | int | float):
 			try:
 				i = int(input)
@@ -383,6 +430,32 @@ class GUI(ui.card):
 			finally:
 				return output
 
+		def fw_plan_errors(input: str | int):
+			try:
+				output = abs(int(input))
+			except ValueError:
+				ui.notify('Error! Value must be positif integer.', color='negative')
+				output = 0	# default
+			finally:
+				return output
+
+		def plan_text(state: state.MainState):
+			try:
+				plan = self.get_test_plan()
+				return f'N = {plan.bits:.2e} bits, T = {durationfrmt(plan.duration)}'
+			except Exception:
+				return '-'
+
+		def apply_plan():
+			plan = self.get_test_plan()
+			if plan.duration>=600:
+				self.state.test_duration_unit = 'm'
+				self.state.test_duration = math.ceil(plan.duration / 60)
+			else:
+				self.state.test_duration_unit = 's'
+				self.state.test_duration = max(math.ceil(plan.duration), 1)
+			self.state.stop_on_confidence = True
+
 		with UIColumn():
 			self.ui_group_label(text='Test Parameter', group_name='test_param')
 			with ui.list().bind_visibility_from(self.state, 'test_param_visible').props('dense').classes('w-full'):
@@ -428,6 +501,49 @@ class GUI(ui.card):
 								.bind_value(self.state, 'test_duration_unit')\
 								.classes('w-1/2')
 				with ui_item():
+					with ui_section():
+						ui_menu_label('Stop on Confidence')
+					with ui_section():
+						with UIRow():
+							ui.switch()\
+								.bind_value(self.state, 'stop_on_confidence')\
+								.props('dense')\
+								.tooltip('Stop as soon as target CL is reached or became unreachable, test duration is then the maximum')
+							ui_select(options={0.9: '90%', 0.95: '95%', 0.99: '99%', 0.999: '99.9%'}, label='Target CL')\
+								.bind_value(self.state, 'target_cl')\
+								.classes('w-full')
+				with ui_item():
+					with ui_section():
+						ui_menu_label('Test Planner')
+					with ui_section():
+						with UIRow():
+							ui_input(label='Allowed Errors')\
+								.bind_value(self.state, 'plan_errors', forward=fw_plan_errors, backward=lambda x: int(x))\
+								.props('dense outlined square type=number input-class=text-center')\
+								.classes('w-1/3')
+							ui_menu_label('-')\
+								.bind_text_from(self, 'state', plan_text)\
+								.classes('w-full text-xs')
+							ui.button(icon='done', on_click=apply_plan)\
+								.props('dense flat rounded')\
+								.tooltip('Use planned duration as test duration')
+				with ui_item():
+					with ui_section():
+						ui_menu_label('Test Mode')
+					with ui_section():
+						with UIRow(overflow='visible'):
+							ui.radio(options={'frame': 'Frame', 'stream': 'Continuous Stream'})\
+								.bind_value(self.state, 'test_mode')\
+								.props('dense inline')\
+								.classes('text-sm')
+							ui.element('div').classes('h-10')
+				with ui_item():
+					with ui_section():
+						ui_menu_label('Test Pattern')
+					with ui_section():
+						ui_select(options=core.PATTERNS)\
+							.bind_value(self.state, 'test_pattern')
+				with ui_item().bind_visibility_from(self.state, 'test_mode', value='frame'):
 					with ui_section():
 						ui_menu_label('Frame Transmission')
 					with ui_section():
@@ -437,6 +553,14 @@ class GUI(ui.card):
 								.props('dense inline')\
 								.classes('text-sm')
 							ui.element('div').classes('h-10')
+				with ui_item().bind_visibility_from(self.state, 'test_mode', value='frame'):
+					with ui_section():
+						ui_menu_label('Frame Window')
+					with ui_section():
+						ui_input()\
+							.bind_value(self.state, 'frame_window', forward=fw_frame_window, backward=lambda x: int(x))\
+							.props('dense outlined square type=number input-class=text-center')\
+							.tooltip('Frames in flight without waiting for their echo, 1 means stop-and-wait')
 
 	def _render_test_result(self) -> None:
 		def calculate_cl(test: core.LoopBackTest):
@@ -446,6 +570,38 @@ class GUI(ui.card):
 			except Exception:
 				return '0%'
 
+		def render_hex_view(e: events.ValueChangeEventArguments) -> None:
+			# Hex dump is only built while the panel is open
+			hex_view.clear()
+			if not e.value or not isinstance(self.test, core.LoopBackTest): return
+			errors = self.test.results.error_results(limit=10)
+			with hex_view:
+				if not errors: ui_menu_label('No error frame.')
+				for res in errors:
+					ui_menu_label(f'{res.total_error_frames} error bytes, {res.total_error_bits} error bits')
+					ui.label(f'tx\n{utils.hexdump(res.sent)}\nrx\n{utils.hexdump(res.received)}')\
+						.classes('font-mono text-xs whitespace-pre overflow-x-auto')
+
+		def refresh_port_table() -> None:
+			if not isinstance(self.test, multiport.MultiPortTest): return
+			port_table.rows[:] = [{
+				**row,
+				'bit_error_rate': f"{row['bit_error_rate']:.1e}",
+				'avg_propagation_time': timefrmt(row['avg_propagation_time'], 3),
+				'p99_propagation_time': timefrmt(row['p99_propagation_time'], 3)
+			} for row in self.test.rows]
+			port_table.update()
+
+		port_columns = [
+			{'name': 'port', 'label': 'Port', 'field': 'port', 'align': 'left'},
+			{'name': 'status', 'label': 'Status', 'field': 'status', 'align': 'left'},
+			{'name': 'counter', 'label': 'Tx/Rx', 'field': 'counter'},
+			{'name': 'total_bits', 'label': 'Bits', 'field': 'total_bits'},
+			{'name': 'total_error_bits', 'label': 'Error Bits', 'field': 'total_error_bits'},
+			{'name': 'bit_error_rate', 'label': 'BER', 'field': 'bit_error_rate'},
+			{'name': 'avg_propagation_time', 'label': 'Avg. Prop.', 'field': 'avg_propagation_time'},
+			{'name': 'p99_propagation_time', 'label': 'p99 Prop.', 'field': 'p99_propagation_time'},
+		]
 		params = [
 			('Frames Transmitted', lambda tst: getattr(tst, 'total_frames_transmitted', '-')),
 			('Frames Received', lambda tst: getattr(tst, 'total_frames_received', '-')),
@@ -456,7 +612,12 @@ class GUI(ui.card):
 			('Bit Error Rate (BER)', lambda tst: f"{getattr(tst, 'bit_error_rate', 0):.1e}"),
 			('Confidence Level (CL)', calculate_cl),
 			('Avg. Propagation Time', lambda tst: timefrmt(getattr(tst, 'avg_propagation_time', 0), 3)),
-			('Avg. Link Latency', lambda tst: timefrmt(getattr(tst, 'avg_travel_time', 0), 3))
+			('Avg. Link Latency', lambda tst: timefrmt(getattr(tst, 'avg_travel_time', 0), 3)),
+			('Avg. Time to First Byte', lambda tst: timefrmt(getattr(tst, 'avg_first_byte_time', 0), 3)),
+			('Propagation Min / Max', lambda tst: f"{timefrmt(getattr(tst, 'min_propagation_time', 0), 3)} / {timefrmt(getattr(tst, 'max_propagation_time', 0), 3)}"),
+			('Propagation Std. Deviation', lambda tst: timefrmt(getattr(tst, 'std_propagation_time', 0), 3)),
+			('Propagation p50 / p99', lambda tst: f"{timefrmt(getattr(tst, 'p50_propagation_time', 0), 3)} / {timefrmt(getattr(tst, 'p99_propagation_time', 0), 3)}"),
+			('Propagation p99.9', lambda tst: timefrmt(getattr(tst, 'p999_propagation_time', 0), 3))
 		]
 		with UIColumn(css_gap='gap-0').bind_visibility_from(self.state, 'tested'):
 			self.ui_group_label(text='Test Result', group_name='test_result')
@@ -472,9 +633,21 @@ class GUI(ui.card):
 									ui_menu_label('0')\
 										.bind_text_from(self, 'test', param[1])\
 										.classes('px-2')
+			port_table = ui.table(columns=port_columns, rows=[], row_key='port')\
+				.bind_visibility_from(self.state, 'mode', value='multi_port')\
+				.props('dense flat bordered')\
+				.classes('w-full text-xs')
+			ui.timer(1.0, refresh_port_table)
+			with ui.expansion('Error Frames (Hex)', on_value_change=render_hex_view)\
+				.bind_visibility_from(self.state, 'test_result_visible')\
+				.props('dense')\
+				.classes('w-full text-sm'):
+				hex_view = UIColumn(css_padding='p-1', css_gap='gap-1')
 
 	def _render_test_control(self) -> None:
 		def ready_to_test(state: state.MainState):
+			if getattr(state, 'mode')=='multi_port':
+				return bool(self.config.port_list.strip()) and not getattr(state, 'test_running')
 			return (self.config.com_port!=None or getattr(state, 'host_available')) and not getattr(state, 'test_running')
 
 		with UIColumn():
@@ -488,11 +661,18 @@ class GUI(ui.card):
 						ui.button('BER Test', on_click=self.character_test)\
 							.bind_enabled_from(self, 'state', ready_to_test)\
 							.props('dense square')
+						with UIRow(gap=2).classes('w-full').bind_visibility_from(self.state, 'job_status', bool):
+							ui.label().classes('text-xs italic').bind_text_from(self.state, 'job_status')
+							ui.space()
+							ui.button('Stop', icon='stop', color='negative', on_click=self.stop_job)\
+								.bind_enabled_from(self.state, 'test_running')\
+								.props('dense flat size=sm')\
+								.tooltip('Stop running test, or leave the queue')
 
 	def _render_debugger(self) -> None:
 		def close_me():
 			debug.close()
-			for dbg in (debug_state, debug_config, debug_test):
+			for dbg in (debug_state, debug_config, debug_test, debug_executors, debug_scheduler):
 				dbg.close()
 
 		with ui.dialog() as debug, ui.card().classes('w-1/2 md:w-full p-0 gap-y-0'):
@@ -500,6 +680,8 @@ class GUI(ui.card):
 				debug_state = ObjectDebugger('state', self.state, render=True)
 				debug_config = ObjectDebugger('config', self.config, render=True)
 				debug_test = ObjectDebugger('test', self.test, render=True, excluded=['results'])
+				debug_executors = ObjectDebugger('executors', executors, render=True, excluded=['analysis', 'analysis_workers'])
+				debug_scheduler = ObjectDebugger('scheduler', scheduler, render=True, excluded=['history'])
 				# debug_utils = ObjectDebugger('utils', utils).render()
 			with ui.row(align_items='center').classes('w-full p-2 gap-1'):
 				ui.space()
@@ -545,7 +727,7 @@ class GUI(ui.card):
 			ui.separator().classes('w-fill')
 		return glabel
 	
-	def get_port(self) -> utils.SerialPort | None:
+	def get_port_config(self) -> dict[str, Any] | None:
 		maps = {'com_port': 'port', 'data_bit': 'bytesize', 'stop_bit': 'stopbits'}
 		exclude = ['flow_control']
 
@@ -555,8 +737,11 @@ class GUI(ui.card):
 			exclude += ['com_port']
 		else:
 			return None
+		return self.config.to_dict(exclude=exclude, maps=maps)
 
-		config = self.config.to_dict(exclude=exclude, maps=maps)
+	def get_port(self) -> utils.SerialPort | None:
+		config = self.get_port_config()
+		if config is None: return None
 		# if settings.DEBUG: print(config)
 		try:
 			port = utils.serial_port_factory(**config)
@@ -566,6 +751,57 @@ class GUI(ui.card):
 		finally:
 			return port
 
+	async def open_port(self, config: dict[str, Any]) -> utils.SerialPort:
+		"""Open port on its own I/O thread, a raw socket connect never stalls the event loop shared by every session."""
+		return await utils.run_in_thread(executors.io(multiport.port_label(config)), functools.partial(utils.serial_port_factory, **config))
+
+	def get_test_plan(self) -> core.TestPlan:
+		# Measured throughput of the last test is preferred over nominal baudrate
+		frame_size = 1 + self.config.data_bit + (1 if self.config.parity in ('E', 'O') else 0) + self.config.stop_bit
+		data_rate = getattr(self.test, 'avg_data_rate', 0) if isinstance(self.test, core.LoopBackTest) else 0
+		return core.plan_test(self.state.desired_ber, self.state.target_cl, self.state.plan_errors, data_rate=data_rate, baudrate=self.config.baudrate, frame_size=frame_size)
+
+	def get_multi_port(self) -> multiport.MultiPortTest:
+		maps = {'data_bit': 'bytesize', 'stop_bit': 'stopbits'}
+		config = self.config.to_dict(exclude=['flow_control', 'com_port', 'remote_ip', 'remote_port'], maps=maps)
+		return multiport.MultiPortTest(self.config.port_list, **config)
+
+	def get_job_ports(self) -> list[str]:
+		if self.state.mode=='multi_port':
+			return [multiport.port_label(spec) for spec in multiport.parse_port_specs(self.config.port_list)]
+		elif self.state.mode=='virtual_com':
+			return [f'{self.config.remote_ip}:{self.config.remote_port}']
+		return [self.config.com_port]
+
+	async def run_job(self, label: str, run: Callable[[Job], Any]) -> Any:
+		"""Run test through port scheduler, it waits while another client holds any of the ports."""
+		def update_status(job: Job) -> None:
+			ports = ', '.join(job.ports) if len(job.ports)<=3 else f'{len(job.ports)} ports'
+			if job.status=='queued':
+				self.state.job_status = f'#{job.id} {label} queued on {ports} (position {job.position})'
+			elif job.status=='running':
+				self.state.job_status = f'#{job.id} {label} running on {ports}'
+			else:
+				self.state.job_status = ''
+
+		self.job = scheduler.submit(self.get_job_ports(), run, owner=self, label=label)
+		unsubscribe = self.job.subscribe(update_status)
+		update_status(self.job)
+		if self.job.status=='queued': ui.notify(f'Port busy, test queued at position {self.job.position}.', color='info')
+		try:
+			return await self.job.wait()
+		except asyncio.CancelledError:
+			# Handler itself cancelled, ports must not stay held by an abandoned job
+			if not self.job.is_done: scheduler.cancel(self.job)
+			raise
+		finally:
+			unsubscribe()
+			self.state.job_status = ''
+			self.job = None
+
+	def stop_job(self) -> None:
+		if self.job is not None: scheduler.cancel(self.job)
+
 	async def _change_host(self, e: events.ValueChangeEventArguments) -> None:
 		self.state.host_checked = False
 		self.state.host_available = False
@@ -592,8 +828,7 @@ class GUI(ui.card):
 	@utils.toggle_attr(name='state.checking_host')
 	async def check_raw_socket(self) -> None:
 		t0 = time.time()
-		with ThreadPoolExecutor(utils.N_THREAD) as tpe:
-			self.state.host_available = await utils.async_tcp_ping(self.config.remote_ip, self.config.remote_port, timeout=self.config.tcp_timeout, executor=tpe)
+		self.state.host_available = await utils.async_tcp_ping(self.config.remote_ip, self.config.remote_port, timeout=self.config.tcp_timeout)
 		if self.state.host_available:
 			ui.notify('Remote host is available.', color='positive')
 		else:
@@ -602,23 +837,43 @@ class GUI(ui.card):
 
 	@utils.toggle_attr(name='state.test_running')
 	async def simple_loop_test(self, e: events.ClickEventArguments) -> None:
+		async def run(job: Job) -> None:
+			if self.state.mode=='multi_port':
+				self.test = job.test = self.get_multi_port()
+				job.on_stop = self.test.stop
+				await self.test.run_once(timeout=self.state.data_timeout)
+				return None
+			# Port is only opened once the scheduler granted it, refers to PySerial Documentation it is returned opened
+			port = await self.open_port(config)
+			try:
+				exchange = await utils.async_serial_sendrcv(port=port, data=b'loop', timeout=self.state.data_timeout, executor=executors.io(port.name))
+				self.test = job.test = core.LoopBackTest(port=port, data=[exchange])
+			finally:
+				port.close()
+			return exchange
+
 		e.sender.props(add='loading')
 		t0 = time.time()
+		config = self.get_port_config()
 		try:
-			# Refers to PySerial Documentation, creating serial instance with defined port will always return opened port
-			port = self.get_port()
-			with ThreadPoolExecutor(utils.N_THREAD) as tpe:
-				send, recv, dt = await utils.async_serial_sendrcv(port=port, data=b'loop', timeout=self.state.data_timeout, executor=tpe)
-				self.test = core.LoopBackTest(port=port, data=[(send, recv, dt)])
+			exchange = await self.run_job('Loop test', run)
+			if self.state.mode=='multi_port':
+				if not self.test.errors and self.test.total_error_bits==0:
+					self.state.tested = True
+					ui.notify(f'Loop test succeed on {len(self.test.tests) - len(self.test.errors)}/{len(self.test.specs)} ports. ({timefrmt(timediff(t0), 3)})', color='positive')
+				else:
+					ui.notify(f'Loop failed on {len(self.test.errors)}/{len(self.test.specs)} ports. ({timefrmt(timediff(t0), 3)})', color='negative')
+			else:
+				send, recv = exchange[:2]
 				if recv==b'':
 					ui.notify(f'Loop failed/timeout. ({timefrmt(timediff(t0), 3)})', color='negative')
 				elif send==recv:
 					self.state.tested = True
 					ui.notify(f'Loop test succeed. ({timefrmt(timediff(t0), 3)})', color='positive')
+		except JobCancelled:
+			ui.notify(f'Loop test cancelled. ({timefrmt(timediff(t0), 3)})', color='warning')
 		except Exception as err:
-			ui.notify(f'Error occured. ({". ".join(err.args)}) [{timefrmt(timediff(t0), 3)}]', color='negative')
-		finally:
-			if port is not None: port.close()
+			ui.notify(f'Error occured. ({". ".join(map(str, err.args))}) [{timefrmt(timediff(t0), 3)}]', color='negative')
 		e.sender.props(remove='loading')
 
 	@utils.toggle_attr(name='state.test_running')
@@ -632,32 +887,60 @@ class GUI(ui.card):
 				ui.label().bind_text_from(self, 'test', test_due_time)
 				ui.label('Test Ongoing...')
 
+		async def run(job: Job) -> None:
+			if self.state.mode=='multi_port':
+				# Each port gets its own pinned I/O executor inside MultiPortTest
+				self.test = job.test = self.get_multi_port()
+				io_kwargs = dict()
+			else:
+				# Port is only opened once the scheduler granted it, refers to PySerial Documentation it is returned opened
+				self.test = job.test = core.LoopBackTest(port=await self.open_port(config))
+				io_kwargs = {'executor': executors.io(self.test.port.name)}
+			job.on_stop = self.test.stop
+			try:
+				if self.state.test_mode=='stream':
+					await self.test.run_stream(duration=test_duration, timeout=self.state.data_timeout, pattern=self.state.test_pattern, **target_kwargs, **io_kwargs)
+				else:
+					await self.test.run_for(
+						duration=test_duration,
+						frame_length=frame_length,
+						timeout=self.state.data_timeout,
+						window=self.state.frame_window,
+						pattern=self.state.test_pattern,
+						min_length=self.state.frame_min_limit,
+						max_length=self.state.max_frame_length,
+						analysis_executor=executors.analysis,
+						reserve=reserve,
+						**target_kwargs,
+						**io_kwargs
+					)
+			finally:
+				if self.state.mode!='multi_port': self.test.port.close()
+
 		e.sender.props(add='loading')
 		t0 = time.time()
 		try:
-			# Refers to PySerial Documentation, creating serial instance with defined port will always return opened port
-			port = self.get_port()
 			test_duration = self.state.test_duration * 60 if self.state.test_duration_unit=='m' else self.state.test_duration
 			frame_length = self.state.max_frame_length if self.state.frame_transmission=='fixed' else None
-			self.test = core.LoopBackTest(port=port)
-			with ThreadPoolExecutor(utils.N_THREAD) as tpe:
-				results = await self.test.run_for(
-					duration=test_duration,
-					frame_length=frame_length,
-					timeout=self.state.data_timeout,
-					min_length=self.state.frame_min_limit,
-					max_length=self.state.max_frame_length,
-					executor=tpe
-				)
-				if results:
-					self.state.tested = True
-					ui.notify(f'Test completed. ({timefrmt(timediff(t0), 3)})', color='positive')
-				else:
-					ui.notify(f'Test completed with errors. ({timefrmt(timediff(t0), 3)})', color='negative')
+			config = self.get_port_config()
+			target_kwargs = {'target_cl': self.state.target_cl if self.state.stop_on_confidence else None, 'desired_ber': self.state.desired_ber}
+			avg_length = frame_length or (self.state.frame_min_limit + self.state.max_frame_length) / 2
+			reserve = self.get_test_plan().exchanges(avg_length, duration=test_duration)
+			await self.run_job('BER test', run)
+			stop_reason = getattr(self.test, 'stop_reason', None)
+			if self.test.total_frames_received>0 and stop_reason=='unreachable':
+				self.state.tested = True
+				ui.notify(f'Test stopped, target confidence level is unreachable. ({timefrmt(timediff(t0), 3)})', color='warning')
+			elif self.test.total_frames_received>0:
+				self.state.tested = True
+				message = {'confidence': 'Target confidence level reached.', 'stopped': 'Test stopped.'}.get(stop_reason, 'Test completed.')
+				ui.notify(f'{message} ({timefrmt(timediff(t0), 3)})', color='positive')
+			else:
+				ui.notify(f'Test completed with errors. ({timefrmt(timediff(t0), 3)})', color='negative')
+		except JobCancelled:
+			ui.notify(f'Test cancelled. ({timefrmt(timediff(t0), 3)})', color='warning')
 		except Exception as err:
-			ui.notify(f'Error occured. ({". ".join(err.args)}) [{timefrmt(timediff(t0), 3)}]', color='negative')
-		finally:
-			if port is not None: port.close()
+			ui.notify(f'Error occured. ({". ".join(map(str, err.args))}) [{timefrmt(timediff(t0), 3)}]', color='negative')
 		e.sender.props(remove='loading')
 
 
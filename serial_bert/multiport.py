@@ -0,0 +1,220 @@
+import asyncio, functools, re
+from typing import Any
+
+from . import core, utils
+from .executor import executors
+
+RE_TCP_SPEC = re.compile(r'^(?P<host>[^:\s]+):(?P<first>\d+)(?:-(?P<last>\d+))?$')
+RE_RANGE_SPEC = re.compile(r'^(?P<prefix>.*?\D)(?P<first>\d+)-(?P<last>\d+)$')
+ROW_FIELDS: tuple[str, ...] = ('counter', 'total_frames_transmitted', 'total_frames_received', 'total_error_frames', 'total_error_bits', 'total_bits', 'bit_error_rate', 'avg_propagation_time', 'p99_propagation_time')
+
+
+def parse_port_specs(specs: str | list[str]) -> list[dict[str, Any]]:
+	"""Expand port specs into serial_port_factory arguments.
+
+	Specs are separated by comma, space or newline, e.g. "COM3-6, /dev/ttyUSB0, 10.0.0.5:4001-4016".
+	"""
+	items = re.split(r'[,\s]+', specs) if isinstance(specs, str) else specs
+	output = list()
+	for spec in filter(None, map(str.strip, items)):
+		if (m := RE_TCP_SPEC.match(spec)):
+			first, last = int(m['first']), int(m['last'] or m['first'])
+			if not 0<first<=last<=65535: raise ValueError(f'Invalid TCP port range "{spec}".')
+			output.extend({'remote_ip': m['host'], 'remote_port': p} for p in range(first, last + 1))
+		elif (m := RE_RANGE_SPEC.match(spec)):
+			first, last = int(m['first']), int(m['last'])
+			if first>last: raise ValueError(f'Invalid serial port range "{spec}".')
+			output.extend({'port': f"{m['prefix']}{n}"} for n in range(first, last + 1))
+		else:
+			output.append({'port': spec})
+	return output
+
+def port_label(spec: dict[str, Any]) -> str:
+	return spec['port'] if 'port' in spec else f"{spec['remote_ip']}:{spec['remote_port']}"
+
+
+class MultiPortTest:
+	"""Run one LoopBackTest per port concurrently, each port I/O is pinned on its own executor thread.
+
+	Exposes the same aggregate attributes as LoopBackTest, summed over all ports which could be opened.
+	"""
+
+	def __init__(self, specs: str | list[str] | list[dict[str, Any]], **port_kwargs) -> None:
+		if isinstance(specs, str) or (specs and isinstance(specs[0], str)): specs = parse_port_specs(specs)
+		self.specs: list[dict[str, Any]] = list(specs)
+		self.port_kwargs = port_kwargs
+		self.tests: dict[str, core.LoopBackTest] = dict()
+		self.errors: dict[str, str] = dict()
+		self.is_running: bool = False
+
+	async def _open(self, spec: dict[str, Any]) -> core.LoopBackTest | None:
+		"""Open port of spec on its own I/O thread, so an unreachable host never blocks the event loop."""
+		label = port_label(spec)
+		try:
+			port = await utils.run_in_thread(executors.io(label), functools.partial(utils.serial_port_factory, **spec, **self.port_kwargs))
+		except Exception as err:
+			self.errors[label] = str(err) or type(err).__name__
+			return None
+		self.tests[label] = test = core.LoopBackTest(port=port)
+		return test
+
+	def close(self) -> None:
+		for test in self.tests.values():
+			test.port.close()
+
+	async def _run_all(self, method: str, **kwargs) -> None:
+		self.close()
+		self.tests = dict()
+		self.errors = dict()
+
+		async def run(spec: dict[str, Any]):
+			label = port_label(spec)
+			test = await self._open(spec)
+			if test is None: return
+			try:
+				executor = None if isinstance(test.port, utils.AsyncTCPRawSocket) else executors.io(test.port.name)
+				await getattr(test, method)(executor=executor, **kwargs)
+			except Exception as err:
+				self.errors[label] = str(err) or type(err).__name__
+
+		try:
+			await asyncio.gather(*(run(spec) for spec in self.specs))
+		finally:
+			self.close()
+
+	@utils.toggle_attr(name='is_running')
+	async def run_once(self, frame_length: int | None = None, timeout: float = 3, **kwargs) -> None:
+		await self._run_all('run_once', frame_length=frame_length, timeout=timeout, **kwargs)
+
+	@utils.toggle_attr(name='is_running')
+	async def run_for(self, duration: float, frame_length: int | None = None, timeout: float = 3, **kwargs) -> None:
+		kwargs.setdefault('analysis_executor', executors.analysis)
+		await self._run_all('run_for', duration=duration, frame_length=frame_length, timeout=timeout, **kwargs)
+
+	@utils.toggle_attr(name='is_running')
+	async def run_stream(self, duration: float, timeout: float = 3, **kwargs) -> None:
+		await self._run_all('run_stream', duration=duration, timeout=timeout, **kwargs)
+
+	def stop(self) -> None:
+		for test in self.tests.values():
+			test.stop()
+
+	def _sum(self, attr: str) -> int | float:
+		return sum(getattr(test, attr) for test in self.tests.values())
+
+	@property
+	def rows(self) -> list[dict[str, Any]]:
+		"""Per-port result rows, followed by an aggregate row."""
+		output = list()
+		for spec in self.specs:
+			label = port_label(spec)
+			test = self.tests.get(label)
+			row = {'port': label, 'status': self.errors.get(label, 'running' if getattr(test, 'is_running', False) else 'done')}
+			for attr in ROW_FIELDS:
+				row[attr] = getattr(test, attr, 0)
+			row['stop_reason'] = getattr(test, 'stop_reason', None)
+			output.append(row)
+		total = {'port': 'Total', 'status': f'{sum(label not in self.errors for label in self.tests)}/{len(self.specs)} ok'}
+		for attr in ROW_FIELDS:
+			total[attr] = getattr(self, attr)
+		output.append(total)
+		return output
+
+	@property
+	def progress(self):
+		return min((test.progress for test in self.tests.values()), default=0.0)
+
+	@property
+	def due_time(self):
+		return max((test.due_time for test in self.tests.values()), default=0.0)
+
+	@property
+	def counter(self):
+		return self._sum('counter')
+
+	@property
+	def total_frames_transmitted(self):
+		return self._sum('total_frames_transmitted')
+
+	@property
+	def total_frames_received(self):
+		return self._sum('total_frames_received')
+
+	@property
+	def total_frames_lost(self):
+		return self.total_frames_transmitted - self.total_frames_received
+
+	@property
+	def total_bits(self):
+		return self._sum('total_bits')
+
+	@property
+	def total_error_frames(self):
+		return self._sum('total_error_frames')
+
+	@property
+	def total_error_bits(self):
+		return self._sum('total_error_bits')
+
+	@property
+	def bit_error_rate(self):
+		if self.total_error_bits>0:
+			return self.total_error_bits / self.total_bits
+		else:
+			return 1 / (self.total_bits + 1) if self.total_bits>0 else 0
+
+	@property
+	def avg_propagation_time(self):
+		# Weighted by exchanges of each port
+		return sum(test.stats.propagation_time.total for test in self.tests.values()) / self.counter if self.counter else 0
+
+	@property
+	def avg_first_byte_time(self):
+		stat = core.RunningStat()
+		for test in self.tests.values():
+			stat.merge(test.stats.first_byte_time)
+		return stat.average
+
+	@property
+	def avg_travel_time(self):
+		return sum(test.avg_travel_time * test.counter for test in self.tests.values()) / self.counter if self.counter else 0
+
+	@property
+	def latency(self) -> core.LatencyHistogram:
+		latency = core.LatencyHistogram()
+		for test in self.tests.values():
+			latency.merge(test.latency)
+		return latency
+
+	@property
+	def propagation_time(self) -> core.RunningStat:
+		stat = core.RunningStat()
+		for test in self.tests.values():
+			stat.merge(test.stats.propagation_time)
+		return stat
+
+	@property
+	def min_propagation_time(self):
+		stat = self.propagation_time
+		return stat.min if stat.count else 0
+
+	@property
+	def max_propagation_time(self):
+		stat = self.propagation_time
+		return stat.max if stat.count else 0
+
+	@property
+	def std_propagation_time(self):
+		return self.propagation_time.stdev
+
+	@property
+	def p50_propagation_time(self):
+		return self.latency.percentile(50)
+
+	@property
+	def p99_propagation_time(self):
+		return self.latency.percentile(99)
+
+	@property
+	def p999_propagation_time(self):
+		return self.latency.percentile(99.9)
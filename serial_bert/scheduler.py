@@ -0,0 +1,154 @@
+import asyncio, collections, itertools, time
+from typing import Any, Awaitable, Callable, Iterable
+
+
+HISTORY_SIZE: int = 50
+
+
+class JobCancelled(Exception):
+	pass
+
+
+def port_key(name: str) -> str:
+	"""Normalized port name, same as executor key, so "COM3" and padded raw socket names compare equal."""
+	return ''.join(str(name).split())
+
+
+class Job:
+	"""Test run of one client, waiting for or holding a set of ports.
+
+	run(job) is awaited once every port is free, it may set job.test (exposed to subscribers) and job.on_stop.
+	Subscribers are called with the job on every status change : queued, running, done, failed or cancelled.
+	"""
+
+	def __init__(self, id: int, ports: tuple[str, ...], run: Callable[['Job'], Awaitable[Any]], owner: Any = None, label: str = '') -> None:
+		self.id = id
+		self.ports = ports
+		self.owner = owner
+		self.label = label
+		self.status: str = 'queued'
+		self.position: int = 0
+		self.test: Any = None
+		self.result: Any = None
+		self.error: Exception | None = None
+		self.created: float = time.time()
+		self.started: float | None = None
+		self.finished: float | None = None
+		self.on_stop: Callable[[], None] | None = None
+		self._run = run
+		self._task: asyncio.Task | None = None
+		self._done = asyncio.Event()
+		self._subscribers: list[Callable[['Job'], Any]] = list()
+
+	def __repr__(self) -> str:
+		return f'<Job {self.id} {self.label!r} {self.status} ports={",".join(self.ports)}>'
+
+	def subscribe(self, callback: Callable[['Job'], Any]) -> Callable[[], None]:
+		"""Call callback on every status change, return a function which unsubscribes it."""
+		self._subscribers.append(callback)
+		return lambda: self._subscribers.remove(callback) if callback in self._subscribers else None
+
+	def _notify(self) -> None:
+		for callback in list(self._subscribers):
+			callback(self)
+
+	async def wait(self) -> Any:
+		"""Wait until the job is finished, return its result or raise its error."""
+		await self._done.wait()
+		if self.status=='cancelled': raise JobCancelled(f'Job {self.id} was cancelled.')
+		if self.error is not None: raise self.error
+		return self.result
+
+	@property
+	def is_done(self) -> bool:
+		return self._done.is_set()
+
+	def to_dict(self) -> dict[str, Any]:
+		return {attr: getattr(self, attr) for attr in ('id', 'label', 'ports', 'status', 'position', 'created', 'started', 'finished')}
+
+
+class PortScheduler:
+	"""Arbitrate ports between clients : one FIFO queue per port, a job runs once it heads the queue of all its ports.
+
+	Jobs on independent ports run in parallel, a job on a busy port waits for the jobs queued before it.
+	"""
+
+	def __init__(self, history_size: int = HISTORY_SIZE) -> None:
+		self._ids = itertools.count(1)
+		self._queues: dict[str, collections.deque[Job]] = dict()
+		self._jobs: dict[int, Job] = dict()
+		self.history: collections.deque[Job] = collections.deque(maxlen=history_size)
+
+	def submit(self, ports: Iterable[str], run: Callable[[Job], Awaitable[Any]], owner: Any = None, label: str = '') -> Job:
+		keys = tuple(dict.fromkeys(map(port_key, ports)))
+		if not keys: raise ValueError('Job requires at least one port.')
+		job = Job(next(self._ids), keys, run, owner=owner, label=label)
+		for key in keys:
+			self._queues.setdefault(key, collections.deque()).append(job)
+		self._jobs[job.id] = job
+		self._dispatch()
+		return job
+
+	def cancel(self, job: Job) -> None:
+		"""Drop a queued job, or ask a running one to stop (through job.on_stop if set, else by cancelling it)."""
+		if job.status=='queued':
+			job.status = 'cancelled'
+			self._finish(job)
+		elif job.status=='running':
+			if job.on_stop is not None:
+				job.on_stop()
+			elif job._task is not None:
+				job._task.cancel()
+
+	def _dispatch(self) -> None:
+		# Jobs dict keeps submission order, so earlier jobs get their ports first
+		for job in list(self._jobs.values()):
+			if job.status!='queued': continue
+			position = max(self._queues[key].index(job) for key in job.ports)
+			if position==0:
+				job.status = 'running'
+				job.position = 0
+				job.started = time.time()
+				job._task = asyncio.ensure_future(self._execute(job))
+				job._notify()
+			elif position!=job.position:
+				job.position = position
+				job._notify()
+
+	async def _execute(self, job: Job) -> None:
+		try:
+			job.result = await job._run(job)
+			job.status = 'done'
+		except asyncio.CancelledError:
+			job.status = 'cancelled'
+		except Exception as err:
+			job.error = err
+			job.status = 'failed'
+		finally:
+			self._finish(job)
+
+	def _finish(self, job: Job) -> None:
+		job.finished = time.time()
+		for key in job.ports:
+			queue = self._queues[key]
+			queue.remove(job)
+			if not queue: del self._queues[key]
+		self._jobs.pop(job.id, None)
+		self.history.append(job)
+		job._done.set()
+		job._notify()
+		self._dispatch()
+
+	def jobs(self, owner: Any = None) -> list[Job]:
+		"""Queued and running jobs, of owner only if given."""
+		return [job for job in self._jobs.values() if owner is None or job.owner is owner]
+
+	def is_busy(self, port: str) -> bool:
+		return port_key(port) in self._queues
+
+	@property
+	def stats(self) -> dict[str, list[str]]:
+		return {key: [f'{job.id}:{job.status}' for job in queue] for key, queue in self._queues.items()}
+
+
+scheduler = PortScheduler()
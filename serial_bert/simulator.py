@@ -0,0 +1,319 @@
+"""In-process loopback simulator with configurable line impairments.
+
+SimulatedPort is a drop-in SerialPort, serial_port_factory returns it for ports named like
+	sim://?ber=1e-5&drop=1e-6&insert=1e-6&burst=1e-7&burst_length=16&latency=0.002&jitter=0.001&seed=1
+SimulatedEchoServer is the raw socket counterpart, a local TCP echo server applying the same impairments :
+	python -m serial_bert.simulator --port 4001 --baudrate 115200 --ber 1e-5
+"""
+
+import argparse, collections, random, socket, threading, time
+from typing import Any, Self
+from urllib.parse import parse_qsl, urlsplit
+
+import numpy as np
+import serial
+
+
+class Impairments:
+	"""Line error model : independent bit flips (ber), byte drops and insertions, error bursts and echo latency jitter.
+
+	Rates are probabilities per bit (ber) or per byte (drop, insert, burst), latency and jitter are in seconds.
+	"""
+	__slots__ = ('ber', 'drop', 'insert', 'burst', 'burst_length', 'latency', 'jitter', 'seed', '_rng', '_lock')
+	_params_: dict[str, type] = {'ber': float, 'drop': float, 'insert': float, 'burst': float, 'burst_length': int, 'latency': float, 'jitter': float, 'seed': int}
+
+	def __init__(self, ber: float = 0, drop: float = 0, insert: float = 0, burst: float = 0, burst_length: int = 8, latency: float = 0, jitter: float = 0, seed: int | None = None) -> None:
+		self.ber = ber
+		self.drop = drop
+		self.insert = insert
+		self.burst = burst
+		self.burst_length = burst_length
+		self.latency = latency
+		self.jitter = jitter
+		self.seed = seed
+		self._rng = np.random.default_rng(seed)
+		# Writer and reader threads of a stream test may both draw from the generator
+		self._lock = threading.Lock()
+
+	@classmethod
+	def from_url(cls, url: str) -> 'Impairments':
+		"""Build from query string of sim:// port name, unknown parameter raises ValueError."""
+		kwargs = dict()
+		for key, value in parse_qsl(urlsplit(url).query):
+			if key not in cls._params_: raise ValueError(f'Unknown simulator parameter "{key}".')
+			kwargs[key] = cls._params_[key](value)
+		return cls(**kwargs)
+
+	def to_dict(self) -> dict[str, Any]:
+		return {key: getattr(self, key) for key in self._params_}
+
+	@property
+	def is_clean(self) -> bool:
+		return self.ber==0 and self.drop==0 and self.insert==0 and self.burst==0
+
+	def apply(self, data: bytes, bits: int = 8) -> bytes:
+		"""Return data as received through impaired line, only the lowest bits of each byte are data bits."""
+		if self.is_clean or not data: return bytes(data)
+		mask = (1 << bits) - 1
+		buff = bytearray(data)
+		n = len(buff)
+		with self._lock:
+			rng = self._rng
+			if self.ber>0:
+				for pos in rng.integers(0, n * bits, rng.binomial(n * bits, self.ber)).tolist():
+					buff[pos // bits] ^= 1 << (pos % bits)
+			if self.burst>0:
+				for start in rng.integers(0, n, rng.binomial(n, self.burst)).tolist():
+					for i in range(start, min(n, start + self.burst_length)):
+						buff[i] ^= int(rng.integers(1, mask + 1))
+			if self.drop>0:
+				keep = rng.random(n)>=self.drop
+				if not keep.all(): buff = bytearray(np.frombuffer(bytes(buff), dtype=np.uint8)[keep].tobytes())
+			if self.insert>0:
+				count = rng.binomial(n, self.insert)
+				# From the end, so earlier positions stay valid
+				for pos in sorted(rng.integers(0, len(buff) + 1, count).tolist(), reverse=True):
+					buff.insert(pos, int(rng.integers(0, mask + 1)))
+		return bytes(buff)
+
+	def delay(self) -> float:
+		if self.jitter<=0: return self.latency
+		with self._lock:
+			return self.latency + float(self._rng.uniform(0, self.jitter))
+
+
+def corrupt(data: bytes, n_sub: int = 0, n_drop: int = 0, n_ins: int = 0, seed: int = 0) -> bytes:
+	"""Return data with exactly n_sub single bit flips, n_drop dropped and n_ins inserted "#" bytes, for tests and benchmarks."""
+	rnd = random.Random(seed)
+	buff = bytearray(data)
+	for _ in range(n_sub):
+		buff[rnd.randrange(len(buff))] ^= 0x01
+	for _ in range(n_drop):
+		del buff[rnd.randrange(len(buff))]
+	for _ in range(n_ins):
+		buff.insert(rnd.randrange(len(buff)), ord('#'))
+	return bytes(buff)
+
+
+class SimulatedPort:
+	"""SerialPort compatible loopback, every written byte is echoed back after impairments at the line timing of baudrate.
+
+	Bytes take one character time each on the line (start, data, parity and stop bits), write blocks only while the
+	transmit buffer is full, and read follows pyserial semantics : wait for size bytes or until timeout.
+	"""
+	_serial_param_: list[str] = ['baudrate', 'bytesize', 'parity', 'stopbits']
+
+	def __init__(self, port: str = 'sim://', baudrate: int = 9600, bytesize: int = 8, parity: str = 'N', stopbits: float = 1, timeout: float | None = 1, impairments: Impairments | None = None, tx_buffer: int = 4096, **kwargs) -> None:
+		self.port = port
+		self.baudrate = baudrate
+		self.bytesize = bytesize
+		self.parity = parity
+		self.stopbits = stopbits
+		self.timeout = timeout
+		self.tx_buffer = tx_buffer
+		self.impairments = impairments or Impairments.from_url(port)
+		self.is_open: bool = True
+		self._cond = threading.Condition()
+		# Echo chunks as [arrival time of first byte, data, bytes already read]
+		self._rx: collections.deque[list] = collections.deque()
+		self._tx_free: float = 0.0
+		self._rx_free: float = 0.0
+
+	def __enter__(self) -> Self:
+		return self
+
+	def __exit__(self, *_) -> None:
+		self.close()
+
+	@property
+	def name(self):
+		return self.port
+
+	@property
+	def char_time(self) -> float:
+		return (1 + self.bytesize + (self.parity in ('E', 'O')) + self.stopbits) / self.baudrate
+
+	def open(self) -> None:
+		self.is_open = True
+
+	def close(self) -> None:
+		with self._cond:
+			self.is_open = False
+			self._rx.clear()
+			self._cond.notify_all()
+
+	def reset_input_buffer(self) -> None:
+		with self._cond:
+			self._rx.clear()
+
+	def write(self, data: bytes, /) -> int:
+		data = bytes(data)
+		char = self.char_time
+		with self._cond:
+			now = time.monotonic()
+			# Transmit buffer is full, wait until the line has drained enough of it
+			while self.is_open and self._tx_free - now>self.tx_buffer * char:
+				self._cond.wait(self._tx_free - now - self.tx_buffer * char)
+				now = time.monotonic()
+			if not self.is_open: raise serial.SerialException('Attempting to use a port that is not open')
+			start = max(now, self._tx_free)
+			self._tx_free = start + len(data) * char
+			echo = self.impairments.apply(data, self.bytesize)
+			if echo:
+				# Echo keeps the order of the line even when latency jitters
+				arrival = max(start + char + self.impairments.delay(), self._rx_free)
+				self._rx_free = arrival + len(echo) * char
+				self._rx.append([arrival, echo, 0])
+				self._cond.notify_all()
+		return len(data)
+
+	def _available(self, now: float) -> int:
+		char = self.char_time
+		count = 0
+		for arrival, echo, offset in self._rx:
+			if now<arrival: break
+			ready = min(len(echo), int((now - arrival) / char) + 1)
+			count += ready - offset
+			if ready<len(echo): break
+		return count
+
+	def _take(self, size: int, now: float) -> bytes:
+		output = bytearray()
+		char = self.char_time
+		while self._rx and len(output)<size:
+			chunk = self._rx[0]
+			arrival, echo, offset = chunk
+			if now<arrival: break
+			ready = min(len(echo), int((now - arrival) / char) + 1)
+			end = min(ready, offset + size - len(output))
+			output += echo[offset:end]
+			if end==len(echo):
+				self._rx.popleft()
+			else:
+				chunk[2] = end
+				if end==ready: break
+		return bytes(output)
+
+	@property
+	def in_waiting(self) -> int:
+		with self._cond:
+			return self._available(time.monotonic())
+
+	def read(self, size: int = 1, /) -> bytes:
+		deadline = None if self.timeout is None else time.monotonic() + self.timeout
+		output = bytearray()
+		with self._cond:
+			while self.is_open:
+				now = time.monotonic()
+				output += self._take(size - len(output), now)
+				if len(output)>=size or (deadline is not None and now>=deadline): break
+				# Sleep until next byte arrives, or until a write appends the first chunk
+				wait = None
+				if self._rx:
+					arrival, _, offset = self._rx[0]
+					wait = max(arrival + offset * self.char_time - now, 0) + 1e-6
+				if deadline is not None: wait = deadline - now if wait is None else min(wait, deadline - now)
+				self._cond.wait(wait)
+		return bytes(output)
+
+	def readinto(self, buffer: bytearray | memoryview, /) -> int:
+		data = self.read(len(buffer))
+		buffer[:len(data)] = data
+		return len(data)
+
+	def flush(self) -> None:
+		pass
+
+
+class SimulatedEchoServer:
+	"""Local TCP echo server with line impairments, stand-in for a terminal server in front of a looped serial port.
+
+	Echo of every received chunk is sent back after impairments, latency and, when baudrate is given, line timing.
+	"""
+
+	def __init__(self, host: str = '127.0.0.1', port: int = 0, baudrate: int | None = None, bytesize: int = 8, impairments: Impairments | None = None) -> None:
+		self.baudrate = baudrate
+		self.bytesize = bytesize
+		self.impairments = impairments or Impairments()
+		self._server = socket.create_server((host, port))
+		self._stop = threading.Event()
+		self._thread: threading.Thread | None = None
+
+	def __enter__(self) -> Self:
+		self.start()
+		return self
+
+	def __exit__(self, *_) -> None:
+		self.close()
+
+	@property
+	def address(self) -> tuple[str, int]:
+		return self._server.getsockname()[:2]
+
+	def start(self) -> None:
+		self._thread = threading.Thread(target=self.serve_forever, name='sim-echo-server', daemon=True)
+		self._thread.start()
+
+	def serve_forever(self) -> None:
+		self._server.settimeout(0.2)
+		while not self._stop.is_set():
+			try:
+				conn, _ = self._server.accept()
+			except TimeoutError:
+				continue
+			except OSError:
+				break
+			threading.Thread(target=self._echo, args=(conn,), name='sim-echo', daemon=True).start()
+
+	def _echo(self, conn: socket.socket) -> None:
+		char = (2 + self.bytesize) / self.baudrate if self.baudrate else 0
+		line_free = 0.0
+		buffer = memoryview(bytearray(65536))
+		with conn:
+			conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+			conn.settimeout(0.2)
+			while not self._stop.is_set():
+				try:
+					n = conn.recv_into(buffer)
+				except TimeoutError:
+					continue
+				except OSError:
+					break
+				if not n: break
+				# Clean line echoes straight from the receive buffer
+				echo = buffer[:n] if self.impairments.is_clean else self.impairments.apply(buffer[:n], self.bytesize)
+				# Whole chunk is sent once its last byte would have arrived on the line
+				line_free = max(time.monotonic() + self.impairments.delay(), line_free) + len(echo) * char
+				wait = line_free - time.monotonic()
+				if wait>0: time.sleep(wait)
+				try:
+					if echo: conn.sendall(echo)
+				except OSError:
+					break
+
+	def close(self) -> None:
+		self._stop.set()
+		self._server.close()
+		if self._thread is not None: self._thread.join()
+
+
+def main(argv: list[str] | None = None) -> None:
+	parser = argparse.ArgumentParser(prog='python -m serial_bert.simulator', description=SimulatedEchoServer.__doc__.splitlines()[0])
+	parser.add_argument('--host', default='127.0.0.1')
+	parser.add_argument('--port', type=int, default=4001)
+	parser.add_argument('--baudrate', type=int, help='Pace echo at line rate of this baudrate (8N1 framing)')
+	for key, kind in Impairments._params_.items():
+		parser.add_argument(f'--{key.replace("_", "-")}', type=kind, default=None)
+	args = parser.parse_args(argv)
+	impairments = Impairments(**{key: getattr(args, key) for key in Impairments._params_ if getattr(args, key) is not None})
+	with SimulatedEchoServer(args.host, args.port, baudrate=args.baudrate, impairments=impairments) as server:
+		print(f'Echo server listening on {server.address[0]}:{server.address[1]} {impairments.to_dict()}', flush=True)
+		try:
+			while True:
+				time.sleep(1)
+		except KeyboardInterrupt:
+			pass
+
+
+if __name__=='__main__':
+	main()
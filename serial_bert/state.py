@@ -33,6 +33,7 @@ class SerialConfig(State):
 		self.remote_ip: str = None
 		self.remote_port: int = None
 		self.tcp_timeout: float = float(os.environ.get('TCP_PACKET_TIMEOUT', 3))
+		self.port_list: str = ''
 
 	def reset(self) -> None:
 		self.__init__()
@@ -65,12 +66,19 @@ class MainState(State):
 		self.desired_ber: float = 1e-6
 		self.test_duration: int = 10
 		self.test_duration_unit: str = 's'
+		self.test_mode: str = 'frame'
+		self.test_pattern: str = 'string'
 		self.frame_transmission: str = 'fixed'
+		self.frame_window: int = 1
+		self.stop_on_confidence: bool = False
+		self.target_cl: float = 0.95
+		self.plan_errors: int = 0
 		self.checking_host: bool = False
 		self.host_available: bool = False
 		self.host_checked: bool = False
 		self.tested: bool = False
 		self.test_running: bool = False
+		self.job_status: str = ''
 
 	def reset(self) -> None:
 		self.__init__()
\ No newline at end of file
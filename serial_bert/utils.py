@@ -1,17 +1,34 @@
-import asyncio, functools, io, os, random, socket, sys, time
-from typing import Any, Callable, TypeAlias, Literal, Self
+import asyncio, bisect, collections, functools, io, os, queue, random, select, socket, sys, threading, time, weakref
+from typing import Any, Callable, Iterable, Iterator, TypeAlias, Literal, Self
 
 import serial
 import serial.serialutil
 import serial.tools.list_ports
 
+from .simulator import SimulatedPort
+
 N_THREAD: int = os.cpu_count() * 2
 COM_PORTS: dict[str, str] = dict()
-BAUD_RATES: list[int] = [600, 1200, 2400, 4800, 9600, 19200, 38400, 57600, 115200]
+# Sorted and shared by every session, custom rates are merged per session or port through baudrate_options()
+BAUD_RATES: list[int] = [600, 1200, 2400, 4800, 9600, 19200, 38400, 57600, 115200, 230400, 460800, 500000, 576000, 921600, 1000000, 1152000, 1500000, 2000000, 2500000, 3000000, 3500000, 4000000]
+MAX_BAUDRATE: int = 12000000
 DATA_BITS: list[int] = [7, 8]
 PARITIES: dict[str, str] = {'N': 'None', 'E': 'Even', 'O': 'Odd'}
 STOP_BITS: list[float] = [1, 1.5, 2]
 FLOW_CONTROLS: list[str] = ['NONE', 'RTS/CTS', 'XON/XOFF']
+FRAME_HEADER_SIZE: int = 5
+SIMULATOR_SCHEME: str = 'sim://'
+# serial_port_factory keywords which only apply to raw socket ports
+SOCKET_OPTIONS: tuple[str, ...] = ('transport', 'tcp_timeout', 'auto_connect', 'nodelay', 'rcvbuf', 'sndbuf')
+# Nanoseconds from exchange start (before write) to write complete, first byte and last byte received, -1 if nothing received
+Phases: TypeAlias = tuple[int, int, int]
+RX_BUFFER_SIZE: int = 4096
+READY_POLL_INTERVAL: float = 0.001
+# Echo bytes beyond the frame length are awaited this many character times after the latest one
+SURPLUS_DRAIN_CHARS: int = 2
+SURPLUS_MIN_ROOM: int = 64
+# Receive buffer of each port, reused by every exchange on that port
+_rx_buffers: weakref.WeakKeyDictionary[Any, bytearray] = weakref.WeakKeyDictionary()
 
 
 def list_available_ports() -> dict[str, str]:
@@ -49,6 +66,11 @@ def subscript(s: str) -> str:
 		"-": "₋", "=": "₌", "(": "₍", ")": "₎"}
 	return ''.join([str_map[c] for c in s])
 
+def hexdump(data: bytes | memoryview, width: int = 16) -> str:
+	"""Render bytes as hex, in rows of width bytes with offset (or one line if width is 0)."""
+	if width<=0: return bytes(data).hex(' ')
+	return '\n'.join(f'{i:04X}  {bytes(data[i:i+width]).hex(" ")}' for i in range(0, len(data), width))
+
 # See https://stackoverflow.com/questions/31174295/getattr-and-setattr-on-nested-objects
 def rsetattr(obj, attr: str, val):
 	pre, _, post = attr.rpartition('.')
@@ -146,22 +168,19 @@ class TCPRawSocket:
 	def read(self, size: int = -1, /) -> bytes:
 		return self._sock.recv(size)
 
-	def sendrecv(self, data: bytes, timeout: float = 10, *args, **kwargs) -> None:
-		buff = bytearray()
-		t0 = time.time()
-		w = self.write(data)
+	def readinto(self, buffer: bytearray | memoryview, /) -> int:
+		return self._sock.recv_into(buffer)
 
-		while data!=buff and time.time()-t0<timeout:
-			r = self.read(w)
-			buff += r
+	def fileno(self) -> int:
+		return self._sock.fileno()
 
-		t1 = time.time()
-		dt = t1 - t0
+	def sendrecv(self, data: bytes, timeout: float = 10, *args, **kwargs) -> tuple[bytes, bytes, float, Phases]:
+		data, buff, dt, phases = serial_sendrcv(self, data, timeout)
 		if os.environ.get('DEBUG'):
-			print(f'[{self.sockname}] tx >> ' + data.decode('ascii'))
-			print(f'[{self.peername}] rx << ' + buff.decode('ascii'))
+			print(f'[{self.sockname}] tx >> ' + hexdump(data, width=0))
+			print(f'[{self.peername}] rx << ' + hexdump(buff, width=0))
 			print(f'Travel time : {dt*1000:.2f} ms')
-		return data, buff, dt
+		return data, buff, dt, phases
 
 	async def async_sendrecv(self, data: str, executor = None, **kwargs):
 		return await run_in_thread(executor, self.sendrecv, data, **kwargs)
@@ -179,7 +198,133 @@ class TCPRawSocket:
 		return '' if self._peername is None else f'{str(self._peername[0]).rjust(16)}:{str(self._peername[1]).ljust(6)}'
 
 
-SerialPort: TypeAlias = serial.serialutil.SerialBase | TCPRawSocket
+class AsyncTCPRawSocket:
+	"""Raw socket on asyncio streams, so many ports can be driven from one event loop without a thread per port.
+
+	Same write/read/sendrecv surface as TCPRawSocket but as coroutines, connection is opened on first use.
+	"""
+	_serial_param_: list[str] = ['baudrate', 'bytesize', 'parity', 'stopbits']
+
+	def __init__(self, target: tuple[str, str | int], tcp_timeout: float = 3, nodelay: bool = True, rcvbuf: int | None = None, sndbuf: int | None = None, read_size: int = 65536, **kwargs) -> None:
+		self.tcp_timeout = tcp_timeout
+		self.nodelay = nodelay
+		self.rcvbuf = rcvbuf
+		self.sndbuf = sndbuf
+		self.read_size = read_size
+		self._target: tuple = (target[0], int(target[1]))
+		self._reader: asyncio.StreamReader | None = None
+		self._writer: asyncio.StreamWriter | None = None
+		self._sockname: tuple[str, int] = None
+		self._peername: tuple[str, int] = None
+
+		for cfg in kwargs:
+			if cfg in self._serial_param_: setattr(self, cfg, kwargs[cfg])
+
+	async def __aenter__(self) -> Self:
+		await self.connect()
+		return self
+
+	async def __aexit__(self, *_) -> None:
+		await self.aclose()
+
+	async def connect(self) -> None:
+		self._reader, self._writer = await asyncio.wait_for(asyncio.open_connection(*self._target), self.tcp_timeout)
+		sock = self._writer.get_extra_info('socket')
+		if self.nodelay: sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+		if self.rcvbuf: sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self.rcvbuf)
+		if self.sndbuf: sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, self.sndbuf)
+		self._sockname = self._writer.get_extra_info('sockname')
+		self._peername = self._writer.get_extra_info('peername')
+		if os.environ.get('DEBUG'): print('Async raw socket connected.')
+
+	def close(self) -> None:
+		if self._writer is not None: self._writer.close()
+		self._reader = None
+		self._writer = None
+		self._sockname = None
+		self._peername = None
+
+	async def aclose(self) -> None:
+		writer = self._writer
+		self.close()
+		if writer is not None:
+			try:
+				await writer.wait_closed()
+			except OSError:
+				pass
+
+	async def write(self, data: bytes, /) -> int:
+		if self._writer is None: await self.connect()
+		self._writer.write(data)
+		await self._writer.drain()
+		return len(data)
+
+	async def read(self, size: int = -1, /, timeout: float | None = None) -> bytes:
+		"""Read whatever is available up to size, empty bytes on timeout."""
+		if self._reader is None: await self.connect()
+		try:
+			async with asyncio.timeout(self.tcp_timeout if timeout is None else timeout):
+				return await self._reader.read(size if size>0 else self.read_size)
+		except TimeoutError:
+			return b''
+
+	async def read_exactly(self, size: int, deadline: float) -> bytes:
+		"""Read size bytes or until loop time deadline, partial data is returned on deadline or EOF."""
+		if self._reader is None: await self.connect()
+		buff = bytearray()
+		try:
+			async with asyncio.timeout_at(deadline):
+				while len(buff)<size:
+					chunk = await self._reader.read(size - len(buff))
+					if not chunk: break
+					buff += chunk
+		except TimeoutError:
+			pass
+		return bytes(buff)
+
+	async def sendrecv(self, data: bytes, timeout: float = 10, *args, **kwargs) -> tuple[bytes, bytes, float, Phases]:
+		loop = asyncio.get_running_loop()
+		if self._writer is None: await self.connect()
+		t0 = time.perf_counter_ns()
+		deadline = loop.time() + timeout
+		w = await self.write(data)
+		t_write = time.perf_counter_ns()
+		# First byte is awaited on its own, so its arrival is timestamped before the rest is drained
+		buff = await self.read_exactly(min(w, 1), deadline)
+		t_first = time.perf_counter_ns() if buff else t0 - 1
+		if buff and w>1: buff += await self.read_exactly(w - 1, deadline)
+		t_last = t_end = time.perf_counter_ns() if buff else t0 - 1
+		if not buff: t_end = time.perf_counter_ns()
+		if len(buff)==w:
+			# Inserted bytes arrive right behind the frame, they are drained so they never shift the next frame
+			budget = SURPLUS_DRAIN_CHARS * char_time(self)
+			while (extra := await self.read(-1, timeout=budget)):
+				buff += extra
+				t_last = t_end = time.perf_counter_ns()
+		dt = (t_end - t0) / 1e9
+		if os.environ.get('DEBUG'):
+			print(f'[{self.sockname}] tx >> ' + hexdump(data, width=0))
+			print(f'[{self.peername}] rx << ' + hexdump(buff, width=0))
+			print(f'Travel time : {dt*1000:.2f} ms')
+		return data, buff, dt, (t_write - t0, t_first - t0, t_last - t0)
+
+	async def async_sendrecv(self, data: bytes, **kwargs) -> tuple[bytes, bytes, float, Phases]:
+		return await self.sendrecv(data, **kwargs)
+
+	@property
+	def name(self):
+		return f'{str(self._target[0]).rjust(16)}:{str(self._target[1]).ljust(6)}'
+
+	@property
+	def sockname(self):
+		return '' if self._sockname is None else f'{str(self._sockname[0]).rjust(16)}:{str(self._sockname[1]).ljust(6)}'
+
+	@property
+	def peername(self):
+		return '' if self._peername is None else f'{str(self._peername[0]).rjust(16)}:{str(self._peername[1]).ljust(6)}'
+
+
+SerialPort: TypeAlias = serial.serialutil.SerialBase | TCPRawSocket | AsyncTCPRawSocket | SimulatedPort
 
 def serial_port_factory(
 		port: str | None = None,
@@ -194,8 +339,21 @@ def serial_port_factory(
 	) -> SerialPort:
 	is_serialcom = port is not None
 	is_rawsocket = not (remote_ip is None or remote_port is None)
+	# Custom rates are accepted, pyserial sets non-standard divisors where the driver supports them
+	baudrate = validate_baudrate(baudrate)
+	# Raw socket options never reach serial.Serial, which rejects unknown keywords
+	socket_options = {key: extras.pop(key) for key in SOCKET_OPTIONS if key in extras}
 
-	if is_serialcom:
+	if is_serialcom and port.startswith(SIMULATOR_SCHEME):
+		return SimulatedPort(
+			port,
+			baudrate=baudrate,
+			bytesize=bytesize,
+			parity=parity,
+			stopbits=stopbits,
+			timeout=timeout
+		)
+	elif is_serialcom:
 		return serial.Serial(
 			port,
 			baudrate=baudrate,
@@ -205,11 +363,23 @@ def serial_port_factory(
 			timeout=timeout,
 			**extras
 		)
+	elif is_rawsocket and socket_options.get('transport')=='asyncio':
+		return AsyncTCPRawSocket(
+			(remote_ip, remote_port),
+			tcp_timeout=socket_options.get('tcp_timeout', 3),
+			nodelay=socket_options.get('nodelay', True),
+			rcvbuf=socket_options.get('rcvbuf'),
+			sndbuf=socket_options.get('sndbuf'),
+			baudrate=baudrate,
+			bytesize=bytesize,
+			parity=parity,
+			stopbits=stopbits
+		)
 	elif is_rawsocket:
 		return TCPRawSocket(
 			(remote_ip, remote_port),
-			tcp_timeout=extras.get('tcp_timeout', 3),
-			auto_connect=extras.get('auto_connect', True),
+			tcp_timeout=socket_options.get('tcp_timeout', 3),
+			auto_connect=socket_options.get('auto_connect', True),
 			baudrate=baudrate,
 			bytesize=bytesize,
 			parity=parity,
@@ -237,58 +407,254 @@ def tcp_ping(ip: str, port: str | int, timeout: float = 3) -> bool:
 async def async_tcp_ping(ip: str, port: int, timeout: float = 3, executor = None) -> bool:
 	return await run_in_thread(executor, tcp_ping, ip, port, timeout)
 
-def serial_sendrcv(port: SerialPort, data: bytes, timeout: float = 10) -> tuple[bytes, bytes, float]:
-	buff = bytearray()
-	t0 = time.time()
-	w = port.write(data)
-
-	while data!=buff and (time.time() - t0)<timeout:
-		# port.read() is blocking function which affected by port read timeout / socket timeout
+def rx_buffer(port: SerialPort, size: int) -> memoryview:
+	"""Preallocated receive buffer of port with at least size bytes, grown by doubling."""
+	buffer = _rx_buffers.get(port)
+	if buffer is None or len(buffer)<size:
+		buffer = bytearray(max(size, 2 * len(buffer) if buffer else RX_BUFFER_SIZE))
+		_rx_buffers[port] = buffer
+	return memoryview(buffer)
+
+def char_time(port: SerialPort) -> float:
+	"""Line time of one character of port in seconds (start, data, parity and stop bits), 0 if baudrate is unknown."""
+	baudrate = getattr(port, 'baudrate', None)
+	if not baudrate: return 0.0
+	return (1 + getattr(port, 'bytesize', 8) + (getattr(port, 'parity', 'N') in ('E', 'O')) + getattr(port, 'stopbits', 1)) / baudrate
+
+def serial_sendrcv(port: SerialPort, data: bytes, timeout: float = 10) -> tuple[bytes, bytes, float, Phases]:
+	size = len(data)
+	# Room for surplus (inserted) bytes, drained after the frame so they never shift the next one
+	view = rx_buffer(port, size + max(size, SURPLUS_MIN_ROOM))
+	n = 0
+	t0 = time.perf_counter_ns()
+	port.write(data)
+	t_write = time.perf_counter_ns()
+	t_first = t_last = t0 - 1
+	timeout_ns = int(timeout * 1e9)
+
+	# Echo is complete once as many bytes as sent are received, content is compared later by analysis
+	while n<size and time.perf_counter_ns() - t0<timeout_ns:
+		# port.readinto() is blocking function which affected by port read timeout / socket timeout
 		# Using high port read timeout / socket timeout value can cause the execution duration exceed the data timeout
-		r = port.read(w)
-		buff += r
-
-	t1 = time.time()
-	dt = t1 - t0
+		# Only waiting bytes are read, so the first byte is timestamped on arrival instead of after the whole frame
+		r = readinto_available(port, view[n:size])
+		if r:
+			t_last = time.perf_counter_ns()
+			if n==0: t_first = t_last
+			n += r
+	t_end = time.perf_counter_ns()
+
+	if n==size:
+		# Inserted bytes arrive right behind the frame, each one extends the wait by a few character times
+		budget = SURPLUS_DRAIN_CHARS * char_time(port)
+		while n<len(view):
+			r = readinto_ready(port, view[n:], budget)
+			if not r: break
+			t_end = t_last = time.perf_counter_ns()
+			n += r
+
+	dt = (t_end - t0) / 1e9
+	# Buffer is reused by next exchange, received data leaves as its own copy
+	buff = bytes(view[:n])
 	if os.environ.get('DEBUG') and False:
 		tx_iface = getattr(port, 'sockname', port.name)
 		rx_iface = getattr(port, 'peername', port.name)
-		print(f'[{tx_iface}] tx >> ' + data.decode('ascii'))
-		print(f'[{rx_iface}] rx << ' + buff.decode('ascii'))
+		print(f'[{tx_iface}] tx >> ' + hexdump(data, width=0))
+		print(f'[{rx_iface}] rx << ' + hexdump(buff, width=0))
 		print(f'Travel time : {dt*1000:.2f} ms')
-	return data, buff, dt
+	return data, buff, dt, (t_write - t0, t_first - t0, t_last - t0)
 
 async def async_serial_sendrcv(port: SerialPort, data: str, timeout: float = 10, executor = None, **kwargs):
+	if isinstance(port, AsyncTCPRawSocket):
+		# Native asyncio transport, no thread involved
+		return await port.sendrecv(data, timeout)
 	return await run_in_thread(executor, serial_sendrcv, port, data, timeout, **kwargs)
 
-def guess_baudrate(data_rate: float, frame_size: int) -> int:
-	if data_rate==0: return None
-	baudrate = sorted(BAUD_RATES)
-	bps = data_rate * frame_size
-	i2 = len(baudrate) // 2
-	i1 = i2 - 1
-	while True:
-		if bps>baudrate[i1] and bps<=baudrate[i2]:
-			return baudrate[i2]
-		elif bps<=baudrate[i1]:
-			i2 = i1
-			if i1-1>=0:
-				# Shift left
-				i1 -= 1
+def frame_header(seq: int) -> bytes:
+	"""Sequence header of pipelined frame, printable ASCII so it survives 7 data bits."""
+	return b'#%04X' % (seq & 0xFFFF)
+
+def read_available(port: SerialPort, size: int) -> bytes:
+	# Serial port knows how many bytes are waiting, raw socket recv() returns whatever is available
+	waiting = getattr(port, 'in_waiting', None)
+	try:
+		return port.read(max(1, min(waiting, size)) if waiting is not None else max(1, size))
+	except TimeoutError:
+		return b''
+
+def readinto_available(port: SerialPort, buffer: memoryview) -> int:
+	"""Read available bytes into buffer without allocating, return number of bytes read."""
+	waiting = getattr(port, 'in_waiting', None)
+	view = buffer[:max(1, min(waiting, len(buffer)))] if waiting is not None else buffer
+	try:
+		return port.readinto(view) or 0
+	except TimeoutError:
+		return 0
+
+def readinto_ready(port: SerialPort, buffer: memoryview, timeout: float) -> int:
+	"""Like readinto_available, but wait at most timeout seconds for the first byte instead of the port read timeout."""
+	end = time.monotonic() + timeout
+	if hasattr(port, 'in_waiting'):
+		while not port.in_waiting:
+			remaining = end - time.monotonic()
+			if remaining<=0: return 0
+			time.sleep(min(remaining, READY_POLL_INTERVAL))
+	else:
+		readable, _, _ = select.select([port], [], [], max(timeout, 0))
+		if not readable: return 0
+	return readinto_available(port, buffer)
+
+def serial_sendrcv_window(port: SerialPort, frames: Iterable[bytes], window: int = 4, timeout: float = 10, resync: int = 16) -> Iterator[tuple[bytes, bytes, float, Phases]]:
+	"""Pipelined exchange, keep up to window sequence-numbered frames in flight and yield (tx, rx, dt, phases) of each frame in order.
+
+	Frames are written by a separate thread while this generator reads the echo stream. Each echo is cut at the expected
+	frame length, or on the header of the next frame when it is found within resync bytes, so a dropped or inserted
+	byte does not shift every following frame.
+
+	A frame whose echo does not start with its own header, while the next header follows right away, is reported with
+	the bytes before that header only (nothing when its whole echo was lost), the rest stays for the following frames.
+
+	Each frame is timed from its write or from the last byte of the previous frame, whichever is later, so time spent
+	queued behind frames ahead of it is not counted. Bytes of one read are spread evenly over the time since the
+	previous read, so frames coalesced in one read still get their own arrival time, never less than their line time.
+	"""
+	slots = threading.Semaphore(window)
+	inflight: queue.Queue[tuple[bytes, int, int] | None] = queue.Queue()
+	stop = threading.Event()
+	errors: list[Exception] = list()
+
+	def writer():
+		try:
+			for seq, payload in enumerate(frames):
+				while not slots.acquire(timeout=0.1):
+					if stop.is_set(): return
+				if stop.is_set(): return
+				frame = frame_header(seq) + payload
+				t0 = time.perf_counter_ns()
+				port.write(frame)
+				inflight.put((frame, t0, time.perf_counter_ns()))
+		except Exception as err:
+			errors.append(err)
+		finally:
+			inflight.put(None)
+
+	thread = threading.Thread(target=writer, name='serial-window-writer', daemon=True)
+	thread.start()
+	buff = bytearray()
+	# Reads not yet consumed from buff as [start time, end time, bytes read, bytes consumed]
+	reads: collections.deque[list[int]] = collections.deque()
+	scratch = rx_buffer(port, RX_BUFFER_SIZE)
+	pending = inflight.get()
+	following = None
+	written_all = False
+	timeout_ns = int(timeout * 1e9)
+	char_ns = int(char_time(port) * 1e9)
+	t_read = 0
+	# Arrival time of the last byte of previous frame
+	t_prev = 0
+
+	def arrival(index: int) -> int:
+		for t_a, t_b, r, used in reads:
+			if index<r - used: return t_a + (t_b - t_a) * (used + index + 1) // r
+			index -= r - used
+		return t_read
+
+	def consume(n: int) -> None:
+		while n>0 and reads:
+			chunk = reads[0]
+			k = min(n, chunk[2] - chunk[3])
+			chunk[3] += k
+			n -= k
+			if chunk[3]==chunk[2]: reads.popleft()
+
+	try:
+		while pending is not None:
+			frame, t0, t_write = pending
+			size = len(frame)
+			cut = None
+			t_start = max(t0, t_prev)
+
+			while cut is None:
+				if following is None and not written_all:
+					try:
+						following = inflight.get_nowait()
+						written_all = following is None
+					except queue.Empty:
+						pass
+
+				if following is not None:
+					# Next frame is already on the line, use its header as frame boundary
+					need = size + resync + FRAME_HEADER_SIZE
+					header = following[0][:FRAME_HEADER_SIZE]
+					if buff[size:size+FRAME_HEADER_SIZE]==header:
+						cut = size
+					else:
+						# Without its own header at the start, this echo may be cut short anywhere or lost entirely (cut at 0)
+						own = len(buff)<FRAME_HEADER_SIZE or buff.startswith(frame[:FRAME_HEADER_SIZE])
+						k = buff.find(header, max(1, size - resync) if own else 0, need)
+						if k>=0:
+							cut = k
+						elif len(buff)>=need:
+							cut = size
+				else:
+					need = size
+					if len(buff)>=size: cut = size
+
+				if cut is None:
+					if time.perf_counter_ns() - t0>=timeout_ns:
+						cut = min(size, len(buff))
+					else:
+						# Whole backlog is read at once, so a burst is spread over all frames it carries
+						r = readinto_available(port, scratch)
+						if r:
+							t_now = time.perf_counter_ns()
+							reads.append([max(t_read, t_start), t_now, r, 0])
+							t_read = t_now
+							buff += scratch[:r]
+
+			rx = bytes(buff[:cut])
+			if rx:
+				t_first, t_prev = max(arrival(0), t_start), max(arrival(cut - 1), t_start)
+				# Interpolated arrivals may be clamped onto t_start, the echo still took its line time after it
+				t_last = t_end = max(t_prev, t_start + cut * char_ns, t_start + 1)
 			else:
-				# i1 is first index
-				return baudrate[i1]
-		elif bps>baudrate[i2]:
-			i1 = i2
-			if i2+1<len(baudrate):
-				# Shift right
-				i2 += 1
+				t_first = t_last = t_start - 1
+				t_end = time.perf_counter_ns()
+			del buff[:cut]
+			consume(cut)
+			slots.release()
+			yield frame, rx, (t_end - t_start) / 1e9, (max(t_write - t_start, 0), t_first - t_start, t_last - t_start)
+
+			if following is not None:
+				pending, following = following, None
 			else:
-				# i2 is last index
-				return baudrate[i2]
-		else:
-			# Impossible
-			pass
+				pending = None if written_all else inflight.get()
+				written_all = written_all or pending is None
+	finally:
+		stop.set()
+		thread.join()
+	if errors: raise errors[0]
+
+def validate_baudrate(baudrate: int | str) -> int:
+	try:
+		rate = int(baudrate)
+	except (TypeError, ValueError):
+		raise ValueError(f'Invalid baudrate "{baudrate}".') from None
+	if not 0<rate<=MAX_BAUDRATE: raise ValueError(f'Baudrate {rate} is out of range (1-{MAX_BAUDRATE}).')
+	return rate
+
+def baudrate_options(*custom: int) -> list[int]:
+	"""Standard table merged with custom rates, for one session or port only (BAUD_RATES itself is never changed)."""
+	return sorted(set(BAUD_RATES).union(filter(None, custom)))
+
+def guess_baudrate(data_rate: float, frame_size: int, custom: Iterable[int] = ()) -> int:
+	"""Lowest known baudrate which carries data_rate (bytes/s), clamped to the table bounds.
+	Custom rates (e.g. the one configured on the port) are candidates too.
+	"""
+	if data_rate==0: return None
+	rates = baudrate_options(*custom) if custom else BAUD_RATES
+	i = bisect.bisect_left(rates, data_rate * frame_size)
+	return rates[min(i, len(rates) - 1)]
 
 
 if __name__=='__main__':
@@ -0,0 +1,73 @@
+import os
+
+import pytest
+
+from serial_bert import capture, core
+
+BITS_STRUCT: core.BitStruct = (1, 8, 0, 1)
+
+
+def exchanges(n: int = 50) -> list[tuple]:
+	output = list()
+	for i in range(n):
+		tx = core.counterpattern(32 + i)
+		rx = tx[:5] + tx[6:] if i % 7==0 else tx
+		output.append((tx, rx, 0.001 * (i + 1), (100, 200 + i, 300 + i)))
+	return output
+
+@pytest.fixture
+def capture_file(tmp_path):
+	path = tmp_path / 'run.sbc'
+	with capture.CaptureWriter(path, BITS_STRUCT) as writer:
+		writer.write_many(exchanges())
+	return path
+
+
+def test_round_trip(capture_file):
+	with capture.CaptureReader(capture_file) as reader:
+		assert reader.bits_structure==BITS_STRUCT
+		records = [(bytes(tx), bytes(rx), dt, phases) for tx, rx, dt, phases in reader]
+		assert len(reader)==50
+	assert records==exchanges()
+
+def test_append_and_reject_other_bits_structure(capture_file):
+	with capture.CaptureWriter(capture_file, BITS_STRUCT) as writer:
+		writer.write(b'abc', b'abc', 0.5)
+	with capture.CaptureReader(capture_file) as reader:
+		assert len(reader)==51
+		assert reader[-1][3] is None
+	with pytest.raises(ValueError):
+		capture.CaptureWriter(capture_file, (1, 7, 1, 1))
+
+def test_truncated_record_is_ignored(capture_file):
+	os.truncate(capture_file, os.path.getsize(capture_file) - 3)
+	with capture.CaptureReader(capture_file) as reader:
+		assert len(reader)==49
+	# Writer drops the partial record, so appended records stay readable
+	with capture.CaptureWriter(capture_file, BITS_STRUCT) as writer:
+		writer.write(b'x', b'x', 0.1)
+	with capture.CaptureReader(capture_file) as reader:
+		assert len(reader)==50
+		assert bytes(reader[-1][0])==b'x'
+
+def test_not_a_capture(tmp_path):
+	path = tmp_path / 'other.bin'
+	path.write_bytes(b'not a capture file')
+	with pytest.raises(ValueError):
+		capture.CaptureReader(path)
+
+def test_analyse_matches_live_stats(capture_file):
+	expected = core.LoopBackStats()
+	for exchange in exchanges():
+		expected.push(core.LoopBackData(*exchange[:3], BITS_STRUCT, exchange[3]))
+	_, stats = capture.analyse(capture_file)
+	assert (stats.counter, stats.error_frames, stats.error_bits, stats.bits)==(expected.counter, expected.error_frames, expected.error_bits, expected.bits)
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_parallel_analysis_matches_sequential(capture_file, workers):
+	_, stats = capture.analyse(capture_file)
+	result = capture.analyse_parallel(capture_file, workers=workers, shards=4)
+	assert (result.stats.counter, result.stats.error_frames, result.stats.error_bits)==(stats.counter, stats.error_frames, stats.error_bits)
+	# Error exchanges are every 7th record, kept in record order
+	assert [index for index, *_ in result.errors]==list(range(0, 50, 7))
+	assert result.histogram.sum()==50
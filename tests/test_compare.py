@@ -0,0 +1,86 @@
+import pytest
+
+from serial_bert import core
+from serial_bert.simulator import corrupt
+
+BITS_STRUCT: core.BitStruct = (1, 8, 0, 1)
+
+
+def test_equal_frames_have_no_diff():
+	data = core.strpattern(255)
+	assert core.bytes_resync_compare(data, data)=={}
+
+def test_substituted_byte():
+	tx = core.counterpattern(256)
+	rx = bytearray(tx)
+	rx[100] ^= 0x81
+	assert core.bytes_resync_compare(tx, bytes(rx))=={100: (tx[100], rx[100])}
+
+def test_dropped_byte():
+	tx = core.strpattern(200)
+	rx = tx[:50] + tx[51:]
+	assert core.bytes_resync_compare(tx, rx)=={50: (tx[50], core.MISSING_BYTE)}
+
+def test_inserted_byte():
+	tx = core.strpattern(200)
+	rx = tx[:50] + b'\x00' + tx[50:]
+	assert core.bytes_resync_compare(tx, rx)=={50: (core.MISSING_BYTE, 0x00)}
+
+def test_missing_tail_and_surplus_tail():
+	tx = core.strpattern(100)
+	assert core.bytes_resync_compare(tx, tx[:90])=={i: (tx[i], core.MISSING_BYTE) for i in range(90, 100)}
+	assert core.bytes_resync_compare(tx, tx + b'\xff')=={100: (core.MISSING_BYTE, 0xFF)}
+
+@pytest.mark.parametrize('seed, expected', [
+	(0, {82: (82, 83), 497: (-1, 35), 523: (-1, 35), 530: (18, -1), 788: (20, 21), 861: (93, 92), 989: (221, -1)}),
+	(1, {129: (129, 128), 241: (241, -1), 275: (19, 18), 461: (-1, 35), 508: (252, -1), 522: (10, 11), 781: (-1, 35)}),
+])
+def test_mixed_errors_stay_local(seed, expected):
+	tx = core.counterpattern(1024)
+	rx = corrupt(tx, n_sub=3, n_drop=2, n_ins=2, seed=seed)
+	# Every error is accounted where it happened, a slip never spreads over the rest of the frame
+	assert core.bytes_resync_compare(tx, rx)==expected
+
+def test_close_errors_are_not_inflated():
+	tx = core.counterpattern(64)
+	rx = bytearray(tx)
+	del rx[8], rx[4]
+	# Both drops fall in one anchor, the span between them is still aligned byte by byte
+	assert core.bytes_resync_compare(tx, bytes(rx))=={4: (4, core.MISSING_BYTE), 8: (8, core.MISSING_BYTE)}
+	rx = bytearray(tx)
+	rx[21] ^= 0x01
+	rx[0] ^= 0x01
+	del rx[4]
+	assert core.bytes_resync_compare(tx, bytes(rx))=={0: (0, 1), 4: (4, core.MISSING_BYTE), 21: (21, 20)}
+
+def test_memoryview_input():
+	tx = core.strpattern(64)
+	rx = tx[:10] + tx[11:]
+	assert core.bytes_resync_compare(memoryview(tx), memoryview(rx))==core.bytes_resync_compare(tx, rx)
+
+def test_xor_count_matches_compare():
+	tx = core.binpattern(512)
+	rx = corrupt(tx, n_sub=10, seed=1)
+	index, bits = core.bytes_xor_count(tx, rx)
+	diff = core.bytes_compare(tx, rx)
+	assert sorted(diff)==index.tolist()
+	assert bits==sum((a ^ b).bit_count() for a, b in diff.values())
+
+def test_loopback_data_counts():
+	tx = core.strpattern(255)
+	equal = core.LoopBackData(tx, corrupt(tx, n_sub=1), 0.01, BITS_STRUCT)
+	assert (equal.total_error_frames, equal.total_error_bits)==(1, 1)
+	dropped = core.LoopBackData(tx, tx[:10] + tx[11:], 0.01, BITS_STRUCT)
+	# Missing byte counts all bits of its character
+	assert (dropped.total_error_frames, dropped.total_error_bits)==(1, 10)
+	assert dropped.error_bytes=={10: (f'{tx[10]:02X}', '')}
+
+def test_zero_time_delta_has_no_data_rate():
+	tx = core.strpattern(16)
+	assert core.LoopBackData(tx, tx, 0.0, BITS_STRUCT).data_rate==0
+
+def test_full_byte_range_round_trip():
+	tx = core.counterpattern(256)
+	result = core.LoopBackData(tx, tx, 0.01, BITS_STRUCT)
+	assert result.total_error_bits==0
+	assert bytes.fromhex(result.to_dict()['received'])==tx
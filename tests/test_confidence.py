@@ -0,0 +1,35 @@
+import math
+
+import pytest
+
+from serial_bert import core
+
+
+@pytest.mark.parametrize('N', [10, 10**3, 10**6, 10**9, 10**12])
+@pytest.mark.parametrize('BER_s', [1e-3, 1e-6, 1e-9, 1e-12])
+def test_confidence_level_matches_scipy(N, BER_s):
+	poisson = pytest.importorskip('scipy.stats').poisson
+	lam = N * BER_s
+	for E in sorted({0, 1, 3, 10, int(lam), int(lam + 3 * math.sqrt(lam)), int(max(lam - 3 * math.sqrt(lam), 0))}):
+		assert core.confidence_level(N, BER_s, E)==pytest.approx(1 - poisson.cdf(E, lam), abs=1e-6)
+
+def test_confidence_level_without_errors():
+	# CL = 1 - exp(-N * BER_s) when no error is measured
+	assert core.confidence_level(3 * 10**6, 1e-6, 0)==pytest.approx(1 - math.exp(-3))
+
+def test_required_bits_reaches_confidence():
+	for E in (0, 1, 5, 50):
+		bits = core.required_bits(1e-9, 0.95, E)
+		assert core.confidence_level(bits, 1e-9, E)>=0.95
+		assert core.confidence_level(bits * 0.99, 1e-9, E)<0.95
+
+def test_required_lambda_rejects_invalid_confidence():
+	with pytest.raises(ValueError):
+		core.required_lambda(1.0, 0)
+
+def test_plan_test_duration():
+	plan = core.plan_test(1e-6, 0.95, data_rate=11520, frame_size=10)
+	assert plan.bits==core.required_bits(1e-6, 0.95, 0)
+	assert plan.duration==pytest.approx(plan.bits / 115200)
+	with pytest.raises(ValueError):
+		core.plan_test(1e-6, 0.95)
@@ -0,0 +1,35 @@
+import random
+
+import numpy as np
+import pytest
+
+from serial_bert import core
+
+
+@pytest.mark.parametrize('p', [50, 90, 99, 99.9])
+def test_histogram_percentile_precision(p):
+	rnd = random.Random(3)
+	values = [rnd.lognormvariate(-7, 1) for _ in range(20000)]
+	histogram = core.LatencyHistogram()
+	for value in values:
+		histogram.record(value)
+	assert histogram.percentile(p)==pytest.approx(np.percentile(values, p, method='inverted_cdf'), rel=0.01)
+
+def test_histogram_merge_and_bounds():
+	a, b = core.LatencyHistogram(), core.LatencyHistogram()
+	for ns in (1000, 2000, 3000):
+		a.record_ns(ns)
+	b.record_ns(10)
+	b.record_ns(10**9)
+	a.merge(b)
+	assert a.count==5
+	assert (a.min, a.max)==(10, 10**9)
+	assert a.percentile(0)==pytest.approx(10e-9)
+	assert a.percentile(100)==pytest.approx(1.0, rel=0.01)
+	assert core.LatencyHistogram().percentile(99)==0.0
+
+def test_histogram_bucket_bounds_cover_index():
+	histogram = core.LatencyHistogram()
+	for value in (0, 1, 127, 128, 129, 1000, 123456, 2**40 + 12345):
+		low, high = histogram._bounds(histogram._index(value))
+		assert low<=value<=high
@@ -0,0 +1,160 @@
+import asyncio, time
+
+import pytest
+
+from serial_bert import core, utils
+from serial_bert.simulator import SimulatedPort
+
+BITS_STRUCT: core.BitStruct = (1, 8, 0, 1)
+
+
+def loopback(url: str, baudrate: int = 921600) -> core.LoopBackTest:
+	return core.LoopBackTest(utils.serial_port_factory(port=url, baudrate=baudrate, timeout=0.5))
+
+
+def test_clean_frame_mode():
+	test = loopback('sim://')
+	asyncio.run(test.run_for(0.3, frame_length=64, timeout=1))
+	assert test.counter>10
+	assert test.total_error_bits==0
+	assert test.total_frames_received==test.total_frames_transmitted
+	assert test._calc_baudrate==921600
+
+def test_inserted_bytes_do_not_shift_later_frames():
+	test = loopback('sim://?insert=1e-3&seed=1')
+	asyncio.run(test.run_for(0.5, frame_length=64, timeout=1))
+	inserted = test.total_frames_received - test.total_frames_transmitted
+	assert inserted>0
+	# Each inserted byte is one error frame in its own exchange, never a run of errors in the following ones
+	assert 0<test.total_error_frames<=inserted
+	assert test.bit_error_rate<1e-2
+
+def test_dropped_bytes_are_counted_once():
+	test = loopback('sim://?drop=2e-3&seed=2')
+	asyncio.run(test.run_for(0.5, frame_length=64, timeout=0.05))
+	lost = test.total_frames_lost
+	assert lost>0
+	assert test.total_error_frames==lost
+
+def test_bit_errors_on_binary_pattern():
+	test = loopback('sim://?ber=1e-3&seed=3')
+	asyncio.run(test.run_for(0.3, frame_length=128, timeout=1, pattern='binary'))
+	assert test.total_frames_lost==0
+	assert 0<test.total_error_bits<=test.total_error_frames * 8
+
+def test_window_frames_are_timed_individually():
+	baudrate = 115200
+	test = loopback('sim://', baudrate=baudrate)
+	asyncio.run(test.run_for(0.5, frame_length=64, timeout=1, window=4))
+	line_time = (64 + utils.FRAME_HEADER_SIZE) * 10 / baudrate
+	assert test.total_error_bits==0
+	# Queueing behind the other frames in flight is not counted
+	assert test.avg_propagation_time<1.5 * line_time
+	assert test._calc_baudrate==baudrate
+
+@pytest.mark.parametrize('impairment', ['drop', 'insert'])
+def test_window_resyncs_on_slip(impairment):
+	test = loopback(f'sim://?{impairment}=1e-3&seed=4')
+	asyncio.run(test.run_for(0.5, frame_length=64, timeout=0.1, window=4))
+	slipped = abs(test.total_frames_received - test.total_frames_transmitted)
+	assert slipped>0
+	# Header of the next frame bounds every slip to the frame it happened in
+	assert test.total_error_frames<=slipped
+
+def test_window_reports_lost_echo_alone():
+
+	class LoseThirdEcho(SimulatedPort):
+		writes = 0
+
+		def write(self, data, /):
+			self.writes += 1
+			if self.writes==3: return len(data)
+			return super().write(data)
+
+	port = LoseThirdEcho('sim://', baudrate=115200, timeout=0.5)
+	frames = [core.strpattern(64) for _ in range(10)]
+	exchanges = list(utils.serial_sendrcv_window(port, frames, window=4, timeout=0.5))
+	assert [rx==tx for tx, rx, _, _ in exchanges]==[True, True, False] + [True] * 7
+	assert exchanges[2][1]==b''
+	# Never faster than the line
+	line_time = len(frames[0] + utils.frame_header(0)) * utils.char_time(port)
+	assert all(dt>=line_time * 0.999 for _, rx, dt, _ in exchanges if rx)
+
+@pytest.mark.parametrize('window', [1, 4])
+def test_analysis_failure_stops_io_stage(window):
+	test = loopback('sim://', baudrate=115200)
+
+	def push(result):
+		raise RuntimeError('analysis failed')
+
+	test._push = push
+	t0 = time.monotonic()
+	with pytest.raises(RuntimeError, match='analysis failed'):
+		asyncio.run(test.run_for(5, frame_length=64, timeout=1, window=window))
+	assert time.monotonic() - t0<2
+	assert test.stop_reason=='error'
+
+def test_early_stop_on_confidence():
+	test = loopback('sim://')
+	asyncio.run(test.run_for(5, frame_length=255, timeout=1, target_cl=0.5, desired_ber=1e-4))
+	assert test.stop_reason=='confidence'
+	assert core.confidence_level(test.total_bits, 1e-4, 0)>=0.5
+
+
+@pytest.mark.parametrize('chunk', [1, 4, 16, 64, 4096])
+@pytest.mark.parametrize('pattern', [core.STRING_COLLECTION.encode(), core.COUNTER_COLLECTION])
+def test_stream_slip_is_realigned_across_reads(chunk, pattern):
+	n = 20000
+	sent = (pattern * (n // len(pattern) + 1))[:n]
+	received = bytearray(sent)
+	del received[5000]
+	received.insert(12000, 0xAA)
+	received[15000] ^= 0x01
+	stats = core.LoopBackStats()
+	stream = core.LoopBackStream(utils.serial_port_factory(port='sim://'), stats, BITS_STRUCT, pattern=pattern)
+	stats.frames_transmitted = n
+	for i in range(0, len(received), chunk):
+		stream.check(memoryview(received)[i:i+chunk])
+	stream.check(memoryview(b''), final=True)
+	assert (stream.dropped, stream.inserted, stream.slips)==(1, 1, 2)
+	assert (stats.error_frames, stats.error_bits)==(3, 21)
+	assert stream.in_flight==0
+
+def test_stream_realigns_masked_counter():
+	# Counter masked to 7 bits repeats every 128 bytes, phase is taken from the shortest period
+	pattern = core.mask_pattern(lambda: core.COUNTER_COLLECTION, 7)()
+	stream = core.LoopBackStream(utils.serial_port_factory(port='sim://'), core.LoopBackStats(), (1, 7, 0, 1), pattern=pattern)
+	assert stream.period==128
+	data = (pattern * 10)[:1000]
+	stream.check(memoryview(data[:300] + data[301:]), final=True)
+	assert (stream.dropped, stream.stats.error_frames)==(1, 1)
+
+@pytest.mark.parametrize('pattern', ['string', 'prbs15'])
+def test_stream_run_is_paced_and_bounded(pattern):
+	baudrate, duration = 115200, 0.5
+	test = loopback('sim://?drop=1e-4&seed=5', baudrate=baudrate)
+	t0 = time.monotonic()
+	asyncio.run(test.run_stream(duration, timeout=1, pattern=pattern))
+	elapsed = time.monotonic() - t0
+	assert elapsed<duration + 0.4
+	# Writer never runs far ahead of the line
+	assert test.total_frames_transmitted<=duration * baudrate / 10 * 1.1 + 1024
+	assert test.total_frames_received>0
+	assert test.total_error_frames<=test.total_error_bits
+	# No exchanges nor per-exchange timing in stream mode, whatever the size of reads
+	assert (test.counter, test.min_propagation_time, test.max_propagation_time, test.avg_travel_time)==(0, 0, 0, 0)
+
+def test_stream_stop():
+	test = loopback('sim://', baudrate=115200)
+
+	async def main():
+		task = asyncio.ensure_future(test.run_stream(10, timeout=1))
+		await asyncio.sleep(0.3)
+		test.stop()
+		await task
+
+	t0 = time.monotonic()
+	asyncio.run(main())
+	assert time.monotonic() - t0<2
+	assert test.stop_reason=='stopped'
+	assert test.total_error_bits==0
@@ -0,0 +1,28 @@
+import asyncio, json, math
+
+import pytest
+
+from serial_bert import multiport
+
+
+def test_parse_port_specs():
+	specs = multiport.parse_port_specs('COM3-5, /dev/ttyUSB0\n10.0.0.5:4001-4002')
+	assert [multiport.port_label(spec) for spec in specs]==['COM3', 'COM4', 'COM5', '/dev/ttyUSB0', '10.0.0.5:4001', '10.0.0.5:4002']
+	with pytest.raises(ValueError):
+		multiport.parse_port_specs('10.0.0.5:4002-4001')
+
+def test_multiport_results_are_valid_json():
+	test = multiport.MultiPortTest('sim://a, sim://b?ber=1e-4&seed=6', baudrate=921600)
+	asyncio.run(test.run_stream(0.3, timeout=1))
+	rows = test.rows
+	assert [row['status'] for row in rows]==['done', 'done', '2/2 ok']
+	assert all(math.isfinite(value) for row in rows for value in row.values() if isinstance(value, float))
+	assert math.isfinite(test.min_propagation_time) and math.isfinite(test.max_propagation_time)
+	json.dumps(rows, allow_nan=False)
+
+def test_multiport_reports_unopenable_port():
+	test = multiport.MultiPortTest(['sim://', 'sim://?noise=1'], baudrate=921600)
+	asyncio.run(test.run_for(0.2, frame_length=32, timeout=1))
+	assert list(test.errors)==['sim://?noise=1']
+	assert test.rows[-1]['status']=='1/2 ok'
+	assert test.total_error_bits==0
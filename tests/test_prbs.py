@@ -0,0 +1,80 @@
+import random
+
+import numpy as np
+import pytest
+
+from serial_bert import core
+
+
+def lfsr_bits(order: int, nbits: int) -> list[int]:
+	"""Naive s[k] = s[k-n] ^ s[k-m] from the all-ones seed, seed included."""
+	n, m = order, core.PRBS_POLYNOMIALS[order]
+	bits = [1] * n
+	while len(bits)<nbits:
+		bits.append(bits[-n] ^ bits[-m])
+	return bits[:nbits]
+
+
+@pytest.mark.parametrize('order', [7, 9, 15, 23, 31])
+def test_prbs_bytes_follow_recurrence(order):
+	data, _ = core.prbs_bytes(order, 512)
+	bits = np.unpackbits(np.frombuffer(data, dtype=np.uint8), bitorder='little').tolist()
+	assert bits==lfsr_bits(order, 512 * 8)
+
+@pytest.mark.parametrize('order', [7, 9])
+def test_prbs_period(order):
+	period = 2 ** order - 1
+	table = core.prbs_table(order, 64)
+	assert len(table)==period + 64
+	assert table[period:]==table[:64]
+
+def test_generator_is_continuous():
+	# Table based and chunked (PRBS31) generators both continue one sequence across calls
+	for order in (15, 31):
+		gen = core.PRBS(order, chunk_size=1000)
+		parts = b''.join(bytes(gen.take(n)) for n in (1, 100, 999, 2000, 7))
+		assert parts==core.prbs_bytes(order, len(parts))[0]
+
+def test_long_take_wraps_period():
+	gen = core.PRBS(7, extent=16)
+	data = bytes(gen.take(300))
+	assert data[:127]==data[127:254]
+
+def test_checker_clean_stream():
+	checker = core.PRBSChecker(15)
+	data = core.prbs_bytes(15, 10000)[0]
+	for i in range(0, len(data), 7):
+		assert checker.check(data[i:i+7])==(0, 0)
+	assert checker.error_bits==0
+
+def test_checker_single_bit_error():
+	data = bytearray(core.prbs_bytes(15, 4000)[0])
+	data[2000] ^= 0x10
+	checker = core.PRBSChecker(15)
+	frames = bits = 0
+	for i in range(0, len(data), 64):
+		f, b = checker.check(data[i:i+64])
+		frames += f
+		bits += b
+	assert (frames, bits)==(1, 1)
+
+@pytest.mark.parametrize('order', [7, 9, 15, 23, 31])
+def test_checker_counts_bytes_of_decoded_errors(order):
+	data = bytearray(core.prbs_bytes(order, 20000)[0])
+	rnd = random.Random(order)
+	errors = sorted(rnd.sample(range(800, 19000 * 8), 50))
+	for k in errors:
+		data[k // 8] ^= 1 << (k % 8)
+	# Last bit has no lookahead, final counts it anyway
+	data[-1] ^= 0x80
+	checker = core.PRBSChecker(order)
+	for i in range(0, len(data), 37):
+		checker.check(data[i:i+37], final=i + 37>=len(data))
+	assert checker.error_bits==51
+	assert checker.error_bytes==len({k // 8 for k in errors}) + 1
+
+def test_pattern_generator_names():
+	for name in core.PATTERNS:
+		assert len(bytes(core.pattern_generator(name)(32)))==32
+	with pytest.raises(ValueError):
+		core.stream_pattern('random')
@@ -0,0 +1,94 @@
+import asyncio
+
+import pytest
+
+from serial_bert.scheduler import JobCancelled, PortScheduler
+
+
+def run(coro):
+	return asyncio.run(coro)
+
+
+def test_independent_ports_run_in_parallel():
+	async def main():
+		scheduler = PortScheduler()
+		started = list()
+
+		async def work(job):
+			started.append(job.id)
+			await asyncio.sleep(0.05)
+			return job.ports
+
+		a = scheduler.submit(['COM1'], work)
+		b = scheduler.submit(['COM2'], work)
+		assert (a.status, b.status)==('running', 'running')
+		assert await a.wait()==('COM1',)
+		assert await b.wait()==('COM2',)
+		return started
+	assert run(main())==[1, 2]
+
+def test_busy_port_queues_in_order():
+	async def main():
+		scheduler = PortScheduler()
+		order = list()
+
+		async def work(job):
+			order.append(job.id)
+			await asyncio.sleep(0.01)
+
+		jobs = [scheduler.submit(ports, work) for ports in (['COM1'], ['COM1', 'COM2'], ['COM2'])]
+		# Job 3 waits behind job 2 on COM2, although COM2 is free at submission
+		assert [job.status for job in jobs]==['running', 'queued', 'queued']
+		assert jobs[1].position==1
+		assert scheduler.is_busy(' COM2 ')
+		await asyncio.gather(*(job.wait() for job in jobs))
+		assert not scheduler.is_busy('COM1')
+		return order
+	assert run(main())==[1, 2, 3]
+
+def test_cancel_queued_and_stop_running():
+	async def main():
+		scheduler = PortScheduler()
+		stop = asyncio.Event()
+
+		async def work(job):
+			job.on_stop = stop.set
+			await stop.wait()
+			return 'stopped'
+
+		running = scheduler.submit(['COM1'], work)
+		queued = scheduler.submit(['COM1'], work)
+		statuses = list()
+		queued.subscribe(lambda job: statuses.append(job.status))
+		scheduler.cancel(queued)
+		with pytest.raises(JobCancelled):
+			await queued.wait()
+		await asyncio.sleep(0)
+		scheduler.cancel(running)
+		assert await running.wait()=='stopped'
+		return statuses, scheduler
+	statuses, scheduler = run(main())
+	assert statuses==['cancelled']
+	assert [job.status for job in scheduler.history]==['cancelled', 'done']
+
+def test_failed_job_releases_port():
+	async def main():
+		scheduler = PortScheduler()
+
+		async def fail(job):
+			raise RuntimeError('port gone')
+
+		async def ok(job):
+			return 1
+
+		failed = scheduler.submit(['COM1'], fail)
+		after = scheduler.submit(['COM1'], ok)
+		with pytest.raises(RuntimeError):
+			await failed.wait()
+		assert await after.wait()==1
+		assert failed.status=='failed'
+	run(main())
+
+def test_job_requires_port():
+	with pytest.raises(ValueError):
+		PortScheduler().submit([], None)
@@ -0,0 +1,46 @@
+import socket, time
+
+import pytest
+
+from serial_bert import utils
+from serial_bert.simulator import Impairments, SimulatedEchoServer, SimulatedPort
+
+
+def test_impairments_from_url():
+	impairments = Impairments.from_url('sim://?ber=1e-5&drop=1e-6&burst_length=4&seed=7')
+	assert (impairments.ber, impairments.drop, impairments.burst_length, impairments.seed)==(1e-5, 1e-6, 4, 7)
+	assert not impairments.is_clean
+	with pytest.raises(ValueError):
+		Impairments.from_url('sim://?noise=1')
+
+def test_impairments_are_reproducible():
+	data = bytes(range(256)) * 40
+	a = Impairments(ber=1e-3, drop=1e-3, insert=1e-3, seed=11).apply(data)
+	b = Impairments(ber=1e-3, drop=1e-3, insert=1e-3, seed=11).apply(data)
+	assert a==b!=data
+
+def test_clean_echo_keeps_line_timing():
+	port = SimulatedPort('sim://', baudrate=115200, timeout=1)
+	data = bytes(range(256)) * 2
+	t0 = time.monotonic()
+	port.write(data)
+	assert port.read(len(data))==data
+	# 512 characters of 10 bits take about 44 ms on the line
+	assert time.monotonic() - t0>=len(data) * port.char_time * 0.9
+	assert port.in_waiting==0
+
+def test_read_times_out_with_partial_data():
+	port = SimulatedPort('sim://?drop=1&seed=1', baudrate=921600, timeout=0.05)
+	port.write(b'abc')
+	assert port.read(3)==b''
+
+def test_factory_returns_simulator():
+	port = utils.serial_port_factory(port='sim://?ber=1e-4', baudrate=230400, bytesize=7, parity='E')
+	assert isinstance(port, SimulatedPort)
+	assert (port.baudrate, port.bytesize, port.parity, port.impairments.ber)==(230400, 7, 'E', 1e-4)
+
+def test_echo_server_round_trip():
+	with SimulatedEchoServer() as server:
+		with socket.create_connection(server.address, timeout=2) as sock:
+			sock.sendall(b'loop')
+			assert sock.recv(16)==b'loop'
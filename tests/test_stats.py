@@ -0,0 +1,48 @@
+import math, random
+
+import numpy as np
+import pytest
+
+from serial_bert import core
+
+BITS_STRUCT: core.BitStruct = (1, 8, 0, 1)
+
+
+def test_running_stat_matches_numpy():
+	values = [random.Random(1).uniform(0, 1) for _ in range(1000)]
+	stat = core.RunningStat()
+	for value in values:
+		stat.push(value)
+	assert stat.average==pytest.approx(np.mean(values))
+	assert stat.stdev==pytest.approx(np.std(values, ddof=1))
+	assert (stat.min, stat.max)==(min(values), max(values))
+
+def test_running_stat_merge():
+	rnd = random.Random(2)
+	values = [rnd.gauss(5, 2) for _ in range(500)]
+	left, right, whole = core.RunningStat(), core.RunningStat(), core.RunningStat()
+	for i, value in enumerate(values):
+		(left if i<200 else right).push(value)
+		whole.push(value)
+	left.merge(right)
+	assert left.count==whole.count
+	assert left.mean==pytest.approx(whole.mean)
+	assert left.variance==pytest.approx(whole.variance)
+	assert core.RunningStat().merge(whole).max==whole.max
+
+def test_empty_running_stat():
+	stat = core.RunningStat()
+	assert (stat.average, stat.stdev, stat.count)==(0, 0.0, 0)
+	assert math.isinf(stat.min)
+
+def test_loopback_stats_merge():
+	tx = core.strpattern(64)
+	results = [core.LoopBackData(tx, tx if i % 3 else tx[:-1], 0.001 * (i + 1), BITS_STRUCT) for i in range(10)]
+	whole, left, right = core.LoopBackStats(), core.LoopBackStats(), core.LoopBackStats()
+	for i, result in enumerate(results):
+		whole.push(result)
+		(left if i<4 else right).push(result)
+	left.merge(right)
+	for attr in ('counter', 'frames_transmitted', 'frames_received', 'bits', 'error_frames', 'error_bits'):
+		assert getattr(left, attr)==getattr(whole, attr)
+	assert left.latency.percentile(50)==whole.latency.percentile(50)
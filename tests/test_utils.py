@@ -0,0 +1,37 @@
+import pytest
+import serial
+
+from serial_bert import utils
+
+
+def test_validate_baudrate():
+	assert utils.validate_baudrate('250000')==250000
+	for value in ('fast', 0, utils.MAX_BAUDRATE + 1, None):
+		with pytest.raises(ValueError):
+			utils.validate_baudrate(value)
+
+def test_custom_baudrate_does_not_change_shared_table():
+	table = list(utils.BAUD_RATES)
+	utils.serial_port_factory(port='sim://', baudrate=100000)
+	assert utils.BAUD_RATES==table
+	assert 100000 in utils.baudrate_options(100000)
+	assert 100000 not in utils.baudrate_options()
+
+def test_guess_baudrate():
+	assert utils.guess_baudrate(0, 10) is None
+	assert utils.guess_baudrate(11000, 10)==115200
+	assert utils.guess_baudrate(9500, 10, custom=(100000,))==100000
+	assert utils.guess_baudrate(1e9, 10)==utils.BAUD_RATES[-1]
+
+def test_socket_options_never_reach_serial():
+	# serial.Serial rejects unknown keywords with ValueError, a missing device is a SerialException
+	with pytest.raises(serial.SerialException):
+		utils.serial_port_factory(port='/dev/serial-bert-missing', transport='asyncio', tcp_timeout=1, nodelay=True)
+
+def test_factory_requires_port_or_host():
+	with pytest.raises(RuntimeError):
+		utils.serial_port_factory()
+
+def test_hexdump():
+	assert utils.hexdump(b'\x00\xff', width=0)=='00 ff'
+	assert utils.hexdump(bytes(20)).splitlines()[1].startswith('0010  00')